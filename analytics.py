@@ -0,0 +1,91 @@
+"""
+Portfolio Analytics
+
+Vectorized growth metrics over YouTube view-count history. Samples for the whole portfolio
+are passed as flat columnar arrays (one row per sample) so every statistic is computed with
+NumPy array operations instead of per-video Python loops.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400.0
+
+
+def percentile_ranks(values: np.ndarray) -> np.ndarray:
+    """Percentile rank (0-100) of each value among the non-NaN values; ties share the mean rank. NaN stays NaN."""
+    ranks = np.full(values.shape, np.nan)
+    valid = ~np.isnan(values)
+    n = int(valid.sum())
+    if n == 0:
+        return ranks
+    ordered = np.sort(values[valid])
+    below = np.searchsorted(ordered, values[valid], side="left")
+    at_or_below = np.searchsorted(ordered, values[valid], side="right")
+    ranks[valid] = (below + at_or_below) / (2.0 * n) * 100.0
+    return ranks
+
+
+def portfolio_growth(
+    video_idx: np.ndarray, t: np.ndarray, views: np.ndarray, growth_days: float = 7.0, n_videos: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """Per-video growth statistics from flat sample arrays.
+
+    video_idx: integer video index per sample (0..n_videos-1)
+    t: sample time per sample, in seconds since the epoch
+    views: view count per sample
+
+    Returns arrays of length `n_videos` (default: max index + 1), NaN for videos without samples:
+    views (latest), first_seen/last_seen (seconds), views_per_day over the sampled span,
+    growth (relative change over the last `growth_days`; NaN when history is shorter),
+    and percentile ranks for views, views_per_day and growth.
+    """
+    if n_videos is None:
+        n_videos = int(video_idx.max()) + 1 if video_idx.size else 0
+    out = {
+        name: np.full(n_videos, np.nan)
+        for name in ("views", "first_seen", "last_seen", "views_per_day", "growth")
+    }
+    if video_idx.size:
+        # Group samples by video, in time order within each video. Stored samples are usually
+        # already chronological per video, so a stable (radix) sort on the video index suffices;
+        # fall back to the much slower full lexsort only when it does not.
+        order = np.argsort(video_idx, kind="stable")
+        vid, ts = video_idx[order], t[order]
+        if not np.all((ts[1:] >= ts[:-1]) | (vid[1:] != vid[:-1])):
+            order = np.lexsort((t, video_idx))
+            vid, ts = video_idx[order], t[order]
+        vs = views[order].astype(float)
+        starts = np.flatnonzero(np.r_[True, vid[1:] != vid[:-1]])
+        ends = np.r_[starts[1:], vid.size] - 1
+        groups = vid[starts]
+
+        first_t, last_t = ts[starts], ts[ends]
+        first_v, last_v = vs[starts], vs[ends]
+        span_days = (last_t - first_t) / SECONDS_PER_DAY
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_day = np.where(span_days > 0, (last_v - first_v) / span_days, np.nan)
+
+        # Latest sample at or before (last_seen - growth_days) for each video, found with one
+        # searchsorted over a composite (video, time) key that is sorted by construction
+        offset = ts - ts.min()
+        scale = offset.max() + growth_days * SECONDS_PER_DAY + 1.0
+        key = vid * scale + offset
+        target = groups * scale + (last_t - ts.min()) - growth_days * SECONDS_PER_DAY
+        base = np.searchsorted(key, target, side="right") - 1
+        has_base = base >= starts
+        base_v = vs[np.where(has_base, base, starts)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            growth = np.where(has_base & (base_v > 0), (last_v - base_v) / base_v, np.nan)
+
+        out["views"][groups] = last_v
+        out["first_seen"][groups] = first_t
+        out["last_seen"][groups] = last_t
+        out["views_per_day"][groups] = per_day
+        out["growth"][groups] = growth
+
+    out["views_percentile"] = percentile_ranks(out["views"])
+    out["views_per_day_percentile"] = percentile_ranks(out["views_per_day"])
+    out["growth_percentile"] = percentile_ranks(out["growth"])
+    return out
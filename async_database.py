@@ -0,0 +1,157 @@
+"""
+Async Database Helper Functions
+
+Motor-based counterparts of the helpers in database.py for use in async endpoints,
+so Mongo round trips never block the event loop. Documents are prepared exactly as
+in database.py (same _to_plain conversion and timestamps).
+"""
+
+from typing import Any, AsyncIterator, Iterable, List, Optional, Tuple, Union
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import BaseModel
+from pymongo.errors import BulkWriteError
+
+from database import (
+    BULK_WRITE_BATCH_SIZE,
+    INSERT_BATCH_SIZE,
+    Selector,
+    SortSpec,
+    _bucket_operations,
+    _bulk_report,
+    _cached_query,
+    _delete_operations,
+    _find,
+    _insert_batches,
+    _invalidates_query_cache,
+    _normalize_sort,
+    _operation_batches,
+    _page_projection,
+    _prepare_document,
+    _record_batch,
+    _record_bulk_batch,
+    _selector_filter,
+    _split_page,
+    _store_query,
+    _update_operations,
+    _update_spec,
+    database_name,
+    database_url,
+    keyset_filter,
+)
+
+_client = None
+db = None
+
+if database_url and database_name:
+    _client = AsyncIOMotorClient(database_url)
+    db = _client[database_name]
+
+
+def _require_db():
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    return db
+
+# Helper functions for common database operations
+@_invalidates_query_cache
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp"""
+    result = await _require_db()[collection_name].insert_one(_prepare_document(data))
+    return str(result.inserted_id)
+
+@_invalidates_query_cache
+async def create_documents(collection_name: str, documents: Iterable[Union[BaseModel, dict]],
+                           batch_size: int = INSERT_BATCH_SIZE, ordered: bool = False) -> dict:
+    """Async counterpart of database.create_documents"""
+    collection = _require_db()[collection_name]
+    report = {"inserted_ids": [], "errors": []}
+    offset = 0
+    for batch in _insert_batches(documents, batch_size):
+        try:
+            await collection.insert_many(batch, ordered=ordered)
+            error = None
+        except BulkWriteError as e:
+            error = e
+        if not _record_batch(report, batch, offset, ordered, error):
+            break
+        offset += len(batch)
+    return report
+
+@_invalidates_query_cache
+async def _bulk_write(collection_name: str, operations: Iterable[Any], batch_size: int, ordered: bool) -> dict:
+    collection = _require_db()[collection_name]
+    report = _bulk_report()
+    offset = 0
+    for batch in _operation_batches(operations, batch_size):
+        try:
+            ok = _record_bulk_batch(report, offset, ordered, result=await collection.bulk_write(batch, ordered=ordered))
+        except BulkWriteError as e:
+            ok = _record_bulk_batch(report, offset, ordered, error=e)
+        if not ok:
+            break
+        offset += len(batch)
+    return report
+
+@_invalidates_query_cache
+async def update_document(collection_name: str, selector: Selector, data: Union[BaseModel, dict], upsert: bool = False) -> bool:
+    """Async counterpart of database.update_document"""
+    result = await _require_db()[collection_name].update_one(_selector_filter(selector), _update_spec(data, upsert), upsert=upsert)
+    return result.modified_count > 0 or result.upserted_id is not None
+
+@_invalidates_query_cache
+async def delete_document(collection_name: str, selector: Selector) -> bool:
+    """Async counterpart of database.delete_document"""
+    result = await _require_db()[collection_name].delete_one(_selector_filter(selector))
+    return result.deleted_count > 0
+
+async def update_documents(collection_name: str, updates: Iterable[Tuple[Selector, Union[BaseModel, dict]]],
+                           batch_size: int = BULK_WRITE_BATCH_SIZE, ordered: bool = False, upsert: bool = False) -> dict:
+    """Async counterpart of database.update_documents"""
+    return await _bulk_write(collection_name, _update_operations(updates, upsert), batch_size, ordered)
+
+async def delete_documents(collection_name: str, selectors: Iterable[Selector],
+                           batch_size: int = BULK_WRITE_BATCH_SIZE, ordered: bool = False) -> dict:
+    """Async counterpart of database.delete_documents"""
+    return await _bulk_write(collection_name, _delete_operations(selectors), batch_size, ordered)
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None,
+                        sort: SortSpec = None, skip: int = None, hint: Any = None, max_time_ms: int = None):
+    """Get documents from collection (see database.get_documents for the options)"""
+    collection = _require_db()[collection_name]
+    cached, token = _cached_query(collection_name, filter_dict, limit, projection, sort, skip, hint)
+    if cached is not None:
+        return cached
+    cursor = _find(collection, filter_dict, projection, sort, skip, limit, hint, max_time_ms=max_time_ms)
+    docs = await cursor.to_list(length=None)
+    _store_query(token, docs)
+    return docs
+
+async def iter_documents(collection_name: str, filter_dict: dict = None, limit: int = None, batch_size: int = None,
+                         projection: dict = None, sort: SortSpec = None, skip: int = None, hint: Any = None) -> AsyncIterator[Any]:
+    """Iterate over matching documents without loading the whole result into memory"""
+    cursor = _find(_require_db()[collection_name], filter_dict, projection, sort, skip, limit, hint, batch_size)
+    async for document in cursor:
+        yield document
+
+async def aggregate(collection_name: str, pipeline: List[dict], allow_disk_use: bool = False) -> List[Any]:
+    """Async counterpart of database.aggregate"""
+    cursor = _require_db()[collection_name].aggregate(pipeline, allowDiskUse=allow_disk_use)
+    return await cursor.to_list(length=None)
+
+async def get_page(collection_name: str, filter_dict: dict = None, limit: int = 50, sort: SortSpec = None,
+                   cursor: str = None, projection: dict = None, hint: Any = None) -> Tuple[List[Any], Optional[str]]:
+    """Async counterpart of database.get_page"""
+    keys = _normalize_sort(sort)
+    docs = await _find(_require_db()[collection_name], keyset_filter(filter_dict, keys, cursor),
+                       _page_projection(projection, keys), keys, None, limit + 1, hint).to_list(length=None)
+    return _split_page(docs, limit, keys)
+
+@_invalidates_query_cache
+async def append_to_buckets(collection_name: str, entries: Iterable[Tuple[dict, dict, Optional[dict]]]):
+    """Async counterpart of database.append_to_buckets"""
+    operations = _bucket_operations(entries)
+    if not operations:
+        return 0
+    result = await _require_db()[collection_name].bulk_write(operations, ordered=False)
+    return result.upserted_count + result.modified_count
@@ -0,0 +1,69 @@
+"""
+Bulk YouTube ID extraction (main.extract_youtube_ids) vs the original per-URL extractor.
+
+The original ran up to three uncompiled re.search calls per URL; the bulk API runs one
+precompiled alternation per URL. Shapes the original misses (shorts, live) are included
+in the mix, so the two are only compared for agreement on the shapes both handle.
+
+Usage: python benchmarks/bench_extract_ids.py [urls]
+"""
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import extract_youtube_ids  # noqa: E402
+
+SHAPES = [
+    "https://youtu.be/{id}?t=42",
+    "https://www.youtube.com/watch?v={id}",
+    "https://www.youtube.com/watch?feature=share&v={id}&list=PL123",
+    "https://m.youtube.com/watch?v={id}",
+    "https://www.youtube.com/embed/{id}?autoplay=1",
+    "https://www.youtube.com/shorts/{id}",
+    "https://www.youtube.com/live/{id}?si=abc",
+    "https://www.notion.so/some-page-{id}",
+]
+LEGACY_SHAPES = set(SHAPES[:5])
+
+
+def legacy_extract_youtube_id(url):
+    try:
+        short_match = re.search(r"youtu\.be/([\w-]{6,})", url)
+        if short_match:
+            return short_match.group(1)
+        id_match = re.search(r"v=([\w-]{6,})", url)
+        if id_match:
+            return id_match.group(1)
+        embed_match = re.search(r"/embed/([\w-]{6,})", url)
+        if embed_match:
+            return embed_match.group(1)
+    except Exception:
+        return None
+    return None
+
+
+def main(n: int = 100_000) -> None:
+    urls, legacy_ok = [], []
+    for i in range(n):
+        shape = SHAPES[i % len(SHAPES)]
+        urls.append(shape.format(id=f"{i:011d}"))
+        legacy_ok.append(shape in LEGACY_SHAPES)
+
+    new = extract_youtube_ids(urls)
+    old = [legacy_extract_youtube_id(u) for u in urls]
+    mismatches = sum(1 for a, b, ok in zip(new, old, legacy_ok) if ok and a != b)
+
+    legacy_s = min(timeit.repeat(lambda: [legacy_extract_youtube_id(u) for u in urls], number=1, repeat=3))
+    bulk_s = min(timeit.repeat(lambda: extract_youtube_ids(urls), number=1, repeat=3))
+    print(f"{n} URLs, {len(SHAPES)} shapes")
+    print(f"legacy per-URL   {legacy_s * 1000:8.1f} ms   ids found {sum(x is not None for x in old)}")
+    print(f"bulk compiled    {bulk_s * 1000:8.1f} ms   ids found {sum(x is not None for x in new)}")
+    print(f"speedup          {legacy_s / bulk_s:8.2f}x   mismatches on shared shapes: {mismatches}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,77 @@
+"""
+Per-call latency of bare requests.get vs the pooled session from http_client.
+
+Runs against a local keep-alive HTTP/1.1 stand-in server, so the difference shown is
+TCP connection setup only; against Google/Notion the pooled client also skips DNS and TLS.
+
+Usage: python benchmarks/bench_http_pool.py [calls]
+"""
+
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_client import close_session, get_session  # noqa: E402
+
+BODY = b'{"items": []}'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY, keep-alive
+    # responses stall on Nagle + delayed ACK and the pooled numbers become meaningless
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def measure(get, url: str, calls: int) -> list:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        get(url, timeout=5).content
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: list) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<16} mean {statistics.mean(timings):7.3f} ms   p50 {statistics.median(timings):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def main(calls: int = 500) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/youtube/v3/videos"
+    try:
+        bare = measure(requests.get, url, calls)
+        session = get_session()
+        session.get(url, timeout=5)  # open the pooled connection outside the timed loop
+        pooled = measure(session.get, url, calls)
+    finally:
+        close_session()
+        server.shutdown()
+    print(f"{calls} sequential GETs against {url}")
+    report("requests.get", bare)
+    report("pooled session", pooled)
+    print(f"speedup (mean)   {statistics.mean(bare) / statistics.mean(pooled):.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
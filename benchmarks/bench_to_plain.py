@@ -0,0 +1,165 @@
+"""
+Compiled per-model converters (database._model_converter) vs the original recursive _to_plain.
+
+The original ran model_dump() and then re-walked every dict/list value with isinstance checks;
+the compiled converter reads field values once and only touches fields whose types need
+conversion (URLs, nested models). Both produce the same document, which is checked first.
+
+Usage: python benchmarks/bench_to_plain.py [documents]
+"""
+
+import dataclasses
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+from typing import Annotated, Dict, List, Optional
+
+import bson
+from pydantic import AnyUrl, BaseModel, HttpUrl, PlainSerializer, RootModel, SerializeAsAny, WrapSerializer
+from pydantic.dataclasses import dataclass as pydantic_dataclass
+from typing_extensions import TypedDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import _model_converter  # noqa: E402
+
+
+def legacy_to_plain(value):
+    if isinstance(value, BaseModel):
+        return {k: legacy_to_plain(v) for k, v in value.model_dump().items()}
+    if isinstance(value, dict):
+        return {k: legacy_to_plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [legacy_to_plain(v) for v in value]
+    if isinstance(value, AnyUrl):
+        return str(value)
+    return value
+
+
+class Thumbnail(BaseModel):
+    url: HttpUrl
+    width: int
+    height: int
+
+
+class Links(RootModel[List[HttpUrl]]):
+    pass
+
+
+class Video(BaseModel):
+    video_id: str
+    title: str
+    url: HttpUrl
+    views: Optional[int] = None
+    likes: Optional[int] = None
+    published_at: datetime
+    tags: List[str] = []
+    thumbnails: Dict[str, Thumbnail] = {}
+    links: Links = Links([])
+
+
+class Portfolio(BaseModel):
+    name: str
+    owner_email: str
+    site: Optional[HttpUrl] = None
+    videos: List[Video]
+    notes: List[str] = []
+
+
+def make_portfolio(i: int) -> Portfolio:
+    now = datetime.now(timezone.utc)
+    return Portfolio(
+        name=f"portfolio-{i}",
+        owner_email=f"owner{i}@example.com",
+        site=f"https://example.com/{i}",
+        notes=["draft", "reviewed"],
+        videos=[
+            Video(
+                video_id=f"vid{i:04d}{n:02d}",
+                title=f"Video {n}",
+                url=f"https://www.youtube.com/watch?v=vid{i:04d}{n:02d}",
+                views=1000 * n,
+                likes=10 * n,
+                published_at=now,
+                tags=["script", "edit", "story"],
+                links=[f"https://example.com/{i}/credits", f"https://example.com/{i}/script"],
+                thumbnails={
+                    size: Thumbnail(url=f"https://i.ytimg.com/vi/{i}/{size}.jpg", width=w, height=w * 9 // 16)
+                    for size, w in (("default", 120), ("medium", 320), ("high", 480))
+                },
+            )
+            for n in range(10)
+        ],
+    )
+
+
+# Shapes model_dump serializes differently from the raw field values; these must fall back
+@dataclasses.dataclass
+class Crop:
+    x: int
+    y: int
+
+
+@pydantic_dataclass
+class Credit:
+    role: str
+    url: HttpUrl
+
+
+class Dimensions(TypedDict):
+    width: int
+    height: int
+
+
+class Upload(BaseModel):
+    name: str
+
+
+class ImageUpload(Upload):
+    url: HttpUrl
+
+
+class Asset(BaseModel):
+    size: Annotated[int, PlainSerializer(lambda v: f"{v} bytes")]
+    checksum: Annotated[str, WrapSerializer(lambda v, handler: handler(v).upper())]
+    tags: List[Annotated[str, PlainSerializer(lambda v: v.strip())]]
+    upload: SerializeAsAny[Upload]
+    crop: Crop
+    credit: Credit
+    dimensions: Dimensions
+
+
+def check_parity(portfolios: List[Portfolio]) -> None:
+    convert = _model_converter(Portfolio)
+    assert all(convert(p) == legacy_to_plain(p) for p in portfolios), "converters disagree"
+    asset = Asset(
+        size=2048,
+        checksum="abc123",
+        tags=[" logo "],
+        upload=ImageUpload(name="logo.png", url="https://example.com/logo.png"),
+        crop=Crop(1, 2),
+        credit=Credit(role="editor", url="https://example.com/editor"),
+        dimensions={"width": 640, "height": 360},
+    )
+    document = _model_converter(Asset)(asset)
+    assert document == legacy_to_plain(asset), "converters disagree on serializer/dataclass fields"
+    bson.encode(document)
+
+
+def main(documents: int = 200) -> None:
+    portfolios = [make_portfolio(i) for i in range(documents)]
+    check_parity(portfolios)
+    convert = _model_converter(Portfolio)
+
+    runs = 5
+    legacy = min(timeit.repeat(lambda: [legacy_to_plain(p) for p in portfolios], number=1, repeat=runs))
+    compiled = min(timeit.repeat(lambda: [convert(p) for p in portfolios], number=1, repeat=runs))
+    print(f"{documents} nested documents (10 videos x 3 thumbnails each), best of {runs}")
+    print(f"_to_plain (legacy)   {legacy * 1000:8.2f} ms   {legacy / documents * 1e6:8.1f} us/doc")
+    print(f"compiled converter   {compiled * 1000:8.2f} ms   {compiled / documents * 1e6:8.1f} us/doc")
+    print(f"speedup              {legacy / compiled:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
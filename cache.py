@@ -0,0 +1,108 @@
+"""
+In-Process Cache
+
+Small thread-safe TTL + LRU cache used to keep upstream lookups (YouTube, Notion)
+off the request path. Entries that outlive their TTL are kept for an extra
+"stale" window so callers can serve them immediately while refreshing in the background.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# Lookup states returned by TTLCache.get
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries are fresh for `ttl` seconds and servable as stale for `stale_ttl` more."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, stale_ttl: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Tuple[str, Any]:
+        """Return (state, value) where state is FRESH, STALE or MISS (value is None on a miss)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS, None
+            value, expires_at = entry
+            if now < expires_at:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return FRESH, value
+            if now < expires_at + self.stale_ttl:
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                return STALE, value
+            del self._data[key]
+            self.misses += 1
+            return MISS, None
+
+    def peek(self, key: Hashable) -> Any:
+        """Return the value if fresh, else None, without touching LRU order or counters."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and time.monotonic() < entry[1]:
+                return entry[0]
+            return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def try_begin_refresh(self, key: Hashable) -> bool:
+        """Claim the background refresh for `key`; False if another caller already holds it."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: Hashable) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshing": len(self._refreshing),
+            }
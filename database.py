@@ -5,12 +5,26 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from pymongo import DeleteOne, IndexModel, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from bson import ObjectId, json_util
 from datetime import datetime, timezone
+import base64
+import copy
+import dataclasses
+import functools
+import inspect
+import itertools
 import os
+import threading
+import types
 from dotenv import load_dotenv
-from typing import Union, Any
-from pydantic import BaseModel, AnyUrl
+from typing import Union, Annotated, Any, Callable, Dict, Iterable, List, Optional, Tuple, get_args, get_origin
+from pydantic import BaseModel, AnyUrl, PlainSerializer, SerializeAsAny, WrapSerializer
+# Recognizes both typing and typing_extensions TypedDicts (pydantic requires the latter before 3.12)
+from typing_extensions import is_typeddict
+
+from cache import MISS, TTLCache
 
 # Load environment variables from .env file
 load_dotenv()
@@ -29,7 +43,7 @@ if database_url and database_name:
 def _to_plain(value: Any) -> Any:
     """Recursively convert Pydantic/BaseModel and special types (e.g., AnyUrl) to Mongo-storable primitives."""
     if isinstance(value, BaseModel):
-        return {k: _to_plain(v) for k, v in value.model_dump().items()}
+        return _model_converter(type(value))(value)
     if isinstance(value, dict):
         return {k: _to_plain(v) for k, v in value.items()}
     if isinstance(value, list):
@@ -39,31 +53,617 @@ def _to_plain(value: Any) -> Any:
     # Leave datetime, str, int, float, bool, None as-is
     return value
 
-# Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
-    """Insert a single document with timestamp"""
-    if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+# Field types whose values are stored as-is (subclasses included, e.g. str enums)
+_PLAIN_TYPES = (str, int, float, bool, bytes, datetime, type(None))
+
+# Converters compiled once per model class by _model_converter
+_model_converters: Dict[type, Callable[[BaseModel], dict]] = {}
+
+# Annotated metadata that makes model_dump serialize a value differently from its raw form
+_SERIALIZER_METADATA = (PlainSerializer, WrapSerializer, SerializeAsAny)
+
+class _NotCompilable(Exception):
+    """A model whose model_dump output a compiled converter cannot reproduce"""
+
+def _check_metadata(metadata: Iterable[Any]) -> None:
+    if any(isinstance(item, _SERIALIZER_METADATA) for item in metadata):
+        raise _NotCompilable
+
+def _dump_model(model: BaseModel) -> Any:
+    """Generic model_dump + _to_plain walk, for models a compiled converter cannot mirror exactly"""
+    return _to_plain(model.model_dump())
+
+def _value_converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """Converter for validated values of `annotation`, or None when they are already storable as-is"""
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is Annotated:
+        _check_metadata(args[1:])
+        return _value_converter(args[0])
+    if origin is Union or origin is types.UnionType:
+        members = [arg for arg in args if arg is not type(None)]
+        converters = [_value_converter(arg) for arg in members]
+        if all(converter is None for converter in converters):
+            return None
+        if len(members) == 1:
+            convert = converters[0]
+            return lambda v: None if v is None else convert(v)
+        return _to_plain
+    if origin is list:
+        convert = _value_converter(args[0]) if args else _to_plain
+        return None if convert is None else (lambda v: [convert(x) for x in v])
+    if origin is dict:
+        convert = _value_converter(args[1]) if args else _to_plain
+        return None if convert is None else (lambda v: {k: convert(x) for k, x in v.items()})
+    if dataclasses.is_dataclass(annotation) or is_typeddict(annotation):
+        # model_dump turns these into dicts (applying nested serializers); leave them to it
+        raise _NotCompilable
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            convert = _model_converter(annotation)
+            # Values are validated instances unless the parent was built with model_construct()
+            return lambda v: convert(v) if isinstance(v, annotation) else _to_plain(v)
+        if issubclass(annotation, AnyUrl):
+            return str
+        if issubclass(annotation, _PLAIN_TYPES):
+            return None
+    # Anything else (Any, tuples, multi-type unions, ...) takes the generic walk
+    return _to_plain
+
+def _compile_model_converter(cls: type) -> Callable[[BaseModel], dict]:
+    decorators = cls.__pydantic_decorators__
+    if (
+        cls.model_config.get("extra") == "allow"
+        or decorators.field_serializers
+        or decorators.model_serializers
+        or decorators.computed_fields
+        or any(field.exclude for field in cls.model_fields.values())
+    ):
+        # model_dump output differs from the raw field values here
+        return _dump_model
+
+    for field in cls.model_fields.values():
+        _check_metadata(field.metadata)
 
+    if getattr(cls, "__pydantic_root_model__", False):
+        # RootModel dumps as its bare root value, not as {"root": ...}
+        convert_root = _value_converter(cls.model_fields["root"].annotation)
+        if convert_root is None:
+            return lambda model: model.root
+        return lambda model: None if model.root is None else convert_root(model.root)
+
+    fields = [(name, _value_converter(field.annotation)) for name, field in cls.model_fields.items()]
+
+    def convert(model: BaseModel) -> dict:
+        values = model.__dict__
+        return {
+            name: value if convert_value is None or value is None else convert_value(value)
+            for name, convert_value in fields
+            for value in (values[name],)
+        }
+
+    return convert
+
+def _model_converter(cls: type) -> Callable[[BaseModel], dict]:
+    """Converter producing the same document as _dump_model(model) for instances of `cls`, in one
+    pass over the field values. Fields whose types need no conversion are copied without inspection.
+    Models using anything that changes how model_dump serializes a field (custom serializers,
+    SerializeAsAny, dataclass or TypedDict fields, ...) use _dump_model itself.
+    """
+    converter = _model_converters.get(cls)
+    if converter is None:
+        # Placeholder so self-referencing models resolve to the finished converter at call time
+        _model_converters[cls] = lambda model: _model_converters[cls](model)
+        try:
+            converter = _model_converters[cls] = _compile_model_converter(cls)
+        except Exception:
+            converter = _model_converters[cls] = _dump_model
+    return converter
+
+def _prepare_document(data: Union[BaseModel, dict]) -> dict:
+    """Convert a model or dict to a storable document stamped with created_at/updated_at"""
     # Convert Pydantic model to dict if needed and coerce special types
     if isinstance(data, BaseModel):
-        data_dict = _to_plain(data)
+        data_dict = _model_converter(type(data))(data)
     else:
         data_dict = _to_plain(data.copy())
 
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
+    return data_dict
 
-    result = db[collection_name].insert_one(data_dict)
-    return str(result.inserted_id)
+def _bucket_operations(entries: Iterable[Tuple[dict, dict, Optional[dict]]]) -> list:
+    """UpdateOne upserts for append_to_buckets (shared with async_database)"""
+    now = datetime.now(timezone.utc)
+    return [
+        UpdateOne(
+            bucket_filter,
+            {
+                "$push": {"samples": _to_plain(sample)},
+                "$inc": {"count": 1},
+                "$set": {**_to_plain(set_fields or {}), "updated_at": now},
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+        )
+        for bucket_filter, sample, set_fields in entries
+    ]
+
+# Opt-in read-through caches for get_documents, per collection (see enable_query_cache)
+_query_caches: Dict[str, TTLCache] = {}
+# Bumped on every write to a cached collection, so reads that raced a write are not cached
+_query_generations: Dict[str, int] = {}
+_query_cache_lock = threading.Lock()
+
+def enable_query_cache(collection_name: str, ttl: float = 60.0, maxsize: int = 256) -> None:
+    """Cache get_documents results for a small, read-mostly collection.
+
+    Results are keyed by filter + options and kept for `ttl` seconds, at most `maxsize`
+    queries. Every write through this module (or async_database) to the collection clears
+    its cache; writes made elsewhere (other processes, the Mongo shell) show up within `ttl`.
+    """
+    _query_caches[collection_name] = TTLCache(maxsize=maxsize, ttl=ttl)
+    _query_generations.setdefault(collection_name, 0)
+
+def invalidate_query_cache(collection_name: str) -> None:
+    cache = _query_caches.get(collection_name)
+    if cache is not None:
+        with _query_cache_lock:
+            _query_generations[collection_name] += 1
+            cache.clear()
+
+def query_cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in _query_caches.items()}
+
+def _query_key(filter_dict, limit, projection, sort, skip, hint) -> str:
+    # Top-level filter/projection fields are order-insensitive; nested documents are not
+    # (embedded-document equality in Mongo depends on field order), so only the top level is sorted
+    return json_util.dumps([
+        sorted((filter_dict or {}).items()), limit or 0, sorted((projection or {}).items()), sort, skip or 0, hint
+    ])
+
+def _cached_query(collection_name: str, *query) -> Tuple[Optional[list], Optional[tuple]]:
+    """(cached documents or None, token for _store_query) for a get_documents call (shared with async_database)"""
+    cache = _query_caches.get(collection_name)
+    if cache is None:
+        return None, None
+    key = _query_key(*query)
+    state, docs = cache.get(key)
+    if state != MISS:
+        # Callers may modify the documents they get back
+        return copy.deepcopy(docs), None
+    return None, (collection_name, key, _query_generations[collection_name])
+
+def _store_query(token: Optional[tuple], docs: list) -> None:
+    if token is None:
+        return
+    collection_name, key, generation = token
+    cache = _query_caches.get(collection_name)
+    if cache is None:
+        return
+    docs = copy.deepcopy(docs)
+    with _query_cache_lock:
+        if _query_generations.get(collection_name) == generation:
+            cache.set(key, docs)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+def _invalidates_query_cache(fn):
+    """Clear the written collection's query cache once a write helper (sync or async) returns or fails"""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(collection_name, *args, **kwargs):
+            try:
+                return await fn(collection_name, *args, **kwargs)
+            finally:
+                invalidate_query_cache(collection_name)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(collection_name, *args, **kwargs):
+        try:
+            return fn(collection_name, *args, **kwargs)
+        finally:
+            invalidate_query_cache(collection_name)
+    return wrapper
+
+# Helper functions for common database operations
+@_invalidates_query_cache
+def create_document(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
-    
-    cursor = db[collection_name].find(filter_dict or {})
+
+    result = db[collection_name].insert_one(_prepare_document(data))
+    return str(result.inserted_id)
+
+# Sort spec: a field name (ascending) or a list of (field, direction) pairs, e.g. [("created_at", -1)]
+SortSpec = Union[str, List[Tuple[str, int]]]
+
+def _find(collection, filter_dict: dict = None, projection: dict = None, sort: SortSpec = None,
+          skip: int = None, limit: int = None, hint: Any = None, batch_size: int = None, max_time_ms: int = None):
+    """Build a find() cursor with the given options applied (shared with async_database)"""
+    # Copy the projection: some drivers add _id to it in place, which would alter shared constants
+    cursor = collection.find(filter_dict or {}, dict(projection) if isinstance(projection, dict) else projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    if skip:
+        cursor = cursor.skip(skip)
     if limit:
         cursor = cursor.limit(limit)
-    
-    return list(cursor)
+    if hint:
+        cursor = cursor.hint(hint)
+    if batch_size:
+        cursor = cursor.batch_size(batch_size)
+    if max_time_ms:
+        cursor = cursor.max_time_ms(max_time_ms)
+    return cursor
+
+# Documents sent per insert_many call by create_documents
+INSERT_BATCH_SIZE = int(os.getenv("INSERT_BATCH_SIZE", "1000"))
+
+def _insert_batches(documents: Iterable[Union[BaseModel, dict]], batch_size: int):
+    """Prepared documents in lists of up to `batch_size` (shared with async_database)"""
+    iterator = iter(documents)
+    while True:
+        batch = [_prepare_document(data) for data in itertools.islice(iterator, batch_size)]
+        if not batch:
+            return
+        yield batch
+
+def _record_batch(report: dict, batch: List[dict], offset: int, ordered: bool, error: Optional[BulkWriteError]) -> bool:
+    """Add a batch's inserted IDs and per-item errors to `report`; False if an ordered insert stopped"""
+    failed = {}
+    for write_error in (error.details.get("writeErrors", []) if error else []):
+        failed[write_error["index"]] = write_error
+        report["errors"].append({
+            "index": offset + write_error["index"],
+            "code": write_error.get("code"),
+            "message": write_error.get("errmsg"),
+        })
+    # An ordered insert stops at its first failure; unordered inserts skip only the failed documents
+    stop_at = min(failed) if ordered and failed else len(batch)
+    report["inserted_ids"].extend(
+        str(document["_id"]) for i, document in enumerate(batch[:stop_at]) if i not in failed
+    )
+    return not (ordered and failed)
+
+@_invalidates_query_cache
+def create_documents(collection_name: str, documents: Iterable[Union[BaseModel, dict]],
+                     batch_size: int = INSERT_BATCH_SIZE, ordered: bool = False) -> dict:
+    """Insert many documents with timestamps, `batch_size` per insert_many round trip.
+
+    Returns {"inserted_ids": [...], "errors": [{"index", "code", "message"}, ...]} where
+    `index` is the position in `documents`. Unordered inserts (the default) keep going past
+    failed documents, e.g. duplicate keys; ordered inserts stop at the first failure.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    collection = db[collection_name]
+    report = {"inserted_ids": [], "errors": []}
+    offset = 0
+    for batch in _insert_batches(documents, batch_size):
+        try:
+            collection.insert_many(batch, ordered=ordered)
+            error = None
+        except BulkWriteError as e:
+            error = e
+        if not _record_batch(report, batch, offset, ordered, error):
+            break
+        offset += len(batch)
+    return report
+
+# A document selector: an _id (ObjectId or its hex string) or a filter dict
+Selector = Union[str, ObjectId, dict]
+
+def _selector_filter(selector: Selector) -> dict:
+    if isinstance(selector, dict):
+        return selector
+    if isinstance(selector, str) and ObjectId.is_valid(selector):
+        return {"_id": ObjectId(selector)}
+    return {"_id": selector}
+
+def _update_spec(data: Union[BaseModel, dict], upsert: bool = False) -> dict:
+    """Update document for `data`: update operators ($set, $inc, $push, ...) pass through, plain
+    fields or a model become $set, and updated_at is always refreshed. Upserts also stamp
+    created_at on the inserted document (shared with async_database)
+    """
+    if isinstance(data, BaseModel):
+        spec = {"$set": _model_converter(type(data))(data)}
+    elif any(key.startswith("$") for key in data):
+        spec = {operator: _to_plain(fields) for operator, fields in data.items()}
+    else:
+        spec = {"$set": _to_plain(data)}
+    now = datetime.now(timezone.utc)
+    spec["$set"] = {**spec.get("$set", {}), "updated_at": now}
+    if upsert and "created_at" not in spec["$set"]:
+        spec["$setOnInsert"] = {**spec.get("$setOnInsert", {}), "created_at": now}
+    return spec
+
+# Operations sent per bulk_write call by update_documents / delete_documents
+BULK_WRITE_BATCH_SIZE = int(os.getenv("BULK_WRITE_BATCH_SIZE", "1000"))
+
+def _update_operations(updates: Iterable[Tuple[Selector, Union[BaseModel, dict]]], upsert: bool = False):
+    return (UpdateOne(_selector_filter(selector), _update_spec(data, upsert), upsert=upsert) for selector, data in updates)
+
+def _delete_operations(selectors: Iterable[Selector]):
+    return (DeleteOne(_selector_filter(selector)) for selector in selectors)
+
+def _operation_batches(operations: Iterable[Any], batch_size: int):
+    iterator = iter(operations)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def _bulk_report() -> dict:
+    return {"matched": 0, "modified": 0, "upserted": 0, "deleted": 0, "errors": []}
+
+def _record_bulk_batch(report: dict, offset: int, ordered: bool, result: Any = None, error: Optional[BulkWriteError] = None) -> bool:
+    """Add one bulk_write batch's counts and per-operation errors to `report`; False if an ordered write stopped"""
+    if error is None:
+        report["matched"] += result.matched_count
+        report["modified"] += result.modified_count
+        report["upserted"] += result.upserted_count
+        report["deleted"] += result.deleted_count
+        return True
+    details = error.details
+    report["matched"] += details.get("nMatched", 0)
+    report["modified"] += details.get("nModified", 0)
+    report["upserted"] += details.get("nUpserted", 0)
+    report["deleted"] += details.get("nRemoved", 0)
+    for write_error in details.get("writeErrors", []):
+        report["errors"].append({
+            "index": offset + write_error["index"],
+            "code": write_error.get("code"),
+            "message": write_error.get("errmsg"),
+        })
+    return not ordered
+
+@_invalidates_query_cache
+def _bulk_write(collection_name: str, operations: Iterable[Any], batch_size: int, ordered: bool) -> dict:
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    collection = db[collection_name]
+    report = _bulk_report()
+    offset = 0
+    for batch in _operation_batches(operations, batch_size):
+        try:
+            ok = _record_bulk_batch(report, offset, ordered, result=collection.bulk_write(batch, ordered=ordered))
+        except BulkWriteError as e:
+            ok = _record_bulk_batch(report, offset, ordered, error=e)
+        if not ok:
+            break
+        offset += len(batch)
+    return report
+
+@_invalidates_query_cache
+def update_document(collection_name: str, selector: Selector, data: Union[BaseModel, dict], upsert: bool = False) -> bool:
+    """Update one document (by _id or filter) and refresh its updated_at; True if a document was updated or upserted.
+
+    `data` is either fields to $set (dict or model) or an update document with operators,
+    e.g. {"$inc": {"view_count": 1}}.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    result = db[collection_name].update_one(_selector_filter(selector), _update_spec(data, upsert), upsert=upsert)
+    return result.modified_count > 0 or result.upserted_id is not None
+
+@_invalidates_query_cache
+def delete_document(collection_name: str, selector: Selector) -> bool:
+    """Delete one document (by _id or filter); True if a document was deleted"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    return db[collection_name].delete_one(_selector_filter(selector)).deleted_count > 0
+
+def update_documents(collection_name: str, updates: Iterable[Tuple[Selector, Union[BaseModel, dict]]],
+                     batch_size: int = BULK_WRITE_BATCH_SIZE, ordered: bool = False, upsert: bool = False) -> dict:
+    """Apply many (selector, data) updates as UpdateOne operations, `batch_size` per bulk_write round trip.
+
+    Each update is built as in update_document, so updated_at is refreshed on every matched
+    document. Returns {"matched", "modified", "upserted", "deleted", "errors"}; each error's
+    `index` is the position in `updates`. Ordered writes stop at the first failure.
+    """
+    return _bulk_write(collection_name, _update_operations(updates, upsert), batch_size, ordered)
+
+def delete_documents(collection_name: str, selectors: Iterable[Selector],
+                     batch_size: int = BULK_WRITE_BATCH_SIZE, ordered: bool = False) -> dict:
+    """Delete many documents (one per selector) as DeleteOne operations, `batch_size` per bulk_write round trip"""
+    return _bulk_write(collection_name, _delete_operations(selectors), batch_size, ordered)
+
+def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None,
+                  sort: SortSpec = None, skip: int = None, hint: Any = None, max_time_ms: int = None):
+    """Get documents from collection.
+
+    `projection` limits the returned fields (e.g. {"name": 1}), `sort` orders the results,
+    `skip` drops that many leading matches and `hint` forces an index (name or key spec).
+    `max_time_ms` makes the server abort the query (ExecutionTimeout) after that many milliseconds.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    cached, token = _cached_query(collection_name, filter_dict, limit, projection, sort, skip, hint)
+    if cached is not None:
+        return cached
+    docs = list(_find(db[collection_name], filter_dict, projection, sort, skip, limit, hint, max_time_ms=max_time_ms))
+    _store_query(token, docs)
+    return docs
+
+def iter_documents(collection_name: str, filter_dict: dict = None, limit: int = None, batch_size: int = None,
+                   projection: dict = None, sort: SortSpec = None, skip: int = None, hint: Any = None):
+    """Yield documents from collection lazily, fetching `batch_size` documents per round trip"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    yield from _find(db[collection_name], filter_dict, projection, sort, skip, limit, hint, batch_size)
+
+def _normalize_sort(sort: SortSpec = None) -> List[Tuple[str, int]]:
+    """Sort spec as (field, direction) pairs, ending with _id so every document has a unique position"""
+    keys = [(sort, 1)] if isinstance(sort, str) else list(sort or [])
+    if not any(field == "_id" for field, _ in keys):
+        keys.append(("_id", keys[-1][1] if keys else 1))
+    return keys
+
+def encode_cursor(document: dict, sort: SortSpec = None) -> str:
+    """Opaque continuation token holding the sort-key values of the last document on a page"""
+    values = [document.get(field) for field, _ in _normalize_sort(sort)]
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode().rstrip("=")
+
+def decode_cursor(token: str, sort: SortSpec = None) -> list:
+    """Sort-key values from an encode_cursor() token; raises ValueError if it is malformed"""
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != len(_normalize_sort(sort)):
+        raise ValueError("Invalid cursor")
+    return values
+
+def keyset_filter(filter_dict: dict = None, sort: SortSpec = None, cursor: str = None) -> dict:
+    """Combine `filter_dict` with a seek past the document `cursor` points at, in `sort` order.
+
+    For sort [(a, -1), (_id, -1)] this matches a < A or (a == A and _id < ID), which an index on
+    (a, _id) answers with a single range scan, so deep pages cost the same as the first.
+    """
+    if not cursor:
+        return filter_dict or {}
+    keys = _normalize_sort(sort)
+    values = decode_cursor(cursor, sort)
+    branches = []
+    for i, (field, direction) in enumerate(keys):
+        branch = {f: v for (f, _), v in zip(keys[:i], values[:i])}
+        branch[field] = {"$gt" if direction > 0 else "$lt": values[i]}
+        branches.append(branch)
+    seek = {"$or": branches} if len(branches) > 1 else branches[0]
+    return {"$and": [filter_dict, seek]} if filter_dict else seek
+
+def _page_projection(projection: Optional[dict], keys: List[Tuple[str, int]]) -> Optional[dict]:
+    # Inclusive projections must keep the sort keys, or the next cursor could not be built
+    if projection and any(v for k, v in projection.items() if k != "_id"):
+        return {**projection, **{field: 1 for field, _ in keys}}
+    return projection
+
+def _split_page(docs: list, limit: int, keys: List[Tuple[str, int]]) -> Tuple[list, Optional[str]]:
+    """Trim the look-ahead document fetched by get_page and build the next cursor (shared with async_database)"""
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1], keys)
+
+def aggregate(collection_name: str, pipeline: List[dict], allow_disk_use: bool = False) -> list:
+    """Run an aggregation pipeline and return its result documents"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    return list(db[collection_name].aggregate(pipeline, allowDiskUse=allow_disk_use))
+
+def get_page(collection_name: str, filter_dict: dict = None, limit: int = 50, sort: SortSpec = None,
+             cursor: str = None, projection: dict = None, hint: Any = None) -> Tuple[list, Optional[str]]:
+    """One page of documents in `sort` order (plus _id as tie-breaker) using keyset pagination.
+
+    Returns (documents, next_cursor); pass next_cursor back as `cursor` for the following page.
+    next_cursor is None on the last page.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    keys = _normalize_sort(sort)
+    docs = list(_find(db[collection_name], keyset_filter(filter_dict, keys, cursor),
+                      _page_projection(projection, keys), keys, None, limit + 1, hint))
+    return _split_page(docs, limit, keys)
+
+@_invalidates_query_cache
+def append_to_buckets(collection_name: str, entries: Iterable[Tuple[dict, dict, Optional[dict]]]):
+    """Append time-series samples using the bucket pattern, in one bulk round trip.
+
+    Each entry is (bucket_filter, sample, set_fields): `sample` is pushed onto the `samples`
+    array of the document matching `bucket_filter` (e.g. one document per series per day),
+    which is created if missing; `set_fields` are $set on the bucket alongside `updated_at`.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    operations = _bucket_operations(entries)
+    if not operations:
+        return 0
+    result = db[collection_name].bulk_write(operations, ordered=False)
+    return result.upserted_count + result.modified_count
+
+# Indexes declared per collection (via register_indexes / register_schema_indexes), applied by ensure_indexes
+_index_registry: Dict[str, Dict[str, IndexModel]] = {}
+
+# Index options compared between the declaration and the server when reconciling
+_INDEX_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+def register_indexes(collection_name: str, indexes: Iterable[IndexModel]) -> None:
+    """Declare indexes for a collection; ensure_indexes() creates any that are missing"""
+    declared = _index_registry.setdefault(collection_name, {})
+    for index in indexes:
+        declared[index.document["name"]] = index
+
+def register_schema_indexes(*models) -> None:
+    """Register the `__indexes__` declared on schema models, keyed by the lowercase class name.
+    Anything that is not a model class is ignored, so a schema module's namespace can be passed as-is.
+    """
+    for model in models:
+        if not (isinstance(model, type) and issubclass(model, BaseModel)):
+            continue
+        indexes = getattr(model, "__indexes__", None)
+        if indexes:
+            register_indexes(model.__name__.lower(), indexes)
+
+def _index_differences(declared: dict, existing: dict) -> List[str]:
+    differences = []
+    # Text indexes are stored as {_fts: "text", _ftsx: 1}, so only non-text keys can be compared
+    if "text" not in declared["key"].values() and list(declared["key"].items()) != list(existing["key"].items()):
+        differences.append("key")
+    differences.extend(option for option in _INDEX_OPTIONS if declared.get(option) != existing.get(option))
+    return differences
+
+def ensure_indexes(drop_extra: bool = False) -> dict:
+    """Reconcile declared indexes with the server and report what was found, per collection.
+
+    Missing indexes are created with create_indexes. Indexes present on the server but not
+    declared are reported as `extra` (and dropped only with drop_extra=True). Indexes whose
+    name matches but whose keys or options differ are reported as `mismatched` and left
+    alone, since changing them means a drop and rebuild.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    report = {}
+    for collection_name, declared in _index_registry.items():
+        collection = db[collection_name]
+        existing = {info["name"]: info for info in collection.list_indexes()}
+        missing = [name for name in declared if name not in existing]
+        entry = {
+            "created": [],
+            "missing": [],
+            "extra": sorted(name for name in existing if name != "_id_" and name not in declared),
+            "mismatched": {},
+            "errors": {},
+        }
+        for name, index in declared.items():
+            if name in existing:
+                differences = _index_differences(index.document, existing[name])
+                if differences:
+                    entry["mismatched"][name] = differences
+        if missing:
+            try:
+                entry["created"] = collection.create_indexes([declared[name] for name in missing])
+            except PyMongoError:
+                # One bad index (e.g. unique over duplicate data) fails the batch; retry one at a time
+                for name in missing:
+                    try:
+                        entry["created"].extend(collection.create_indexes([declared[name]]))
+                    except PyMongoError as e:
+                        entry["missing"].append(name)
+                        entry["errors"][name] = str(e)
+        if drop_extra:
+            for name in entry["extra"]:
+                collection.drop_index(name)
+            entry["dropped"] = entry["extra"]
+        report[collection_name] = entry
+    return report
@@ -0,0 +1,85 @@
+"""
+Shared HTTP Clients
+
+Connection-pooled clients for outbound calls (Notion, YouTube Data API).
+Reusing keep-alive connections avoids paying DNS, TCP and TLS setup on every call.
+Use get_session() from sync code and get_async_client() from async code.
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Sync pool: number of hosts kept pooled, and connections kept alive per host
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+# Async pool: total connections, idle keep-alive connections and how long idle ones are kept
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# HTTP/2 is only used by the async client, and only when the `h2` package is installed
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1").lower() not in ("0", "false", "no")
+
+_session: Optional[requests.Session] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def get_session() -> requests.Session:
+    """Process-wide requests.Session with a keep-alive pool of HTTP_POOL_MAXSIZE connections per host."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Process-wide httpx.AsyncClient (HTTP/2 when available). Call it from the event loop.
+    Pooled connections belong to the loop that opened them, so a new client is made if the
+    running loop changes (e.g. test clients that start a loop per request).
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        _async_client_loop = loop
+        _async_client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED and http2_available(),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _async_client
+
+
+def close_session() -> None:
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+async def aclose_async_client() -> None:
+    global _async_client, _async_client_loop
+    if _async_client is not None and _async_client_loop is asyncio.get_running_loop():
+        client, _async_client, _async_client_loop = _async_client, None, None
+        await client.aclose()
@@ -1,16 +1,62 @@
+import asyncio
+import codecs
+import hashlib
+import itertools
+import json
 import os
 import re
-from datetime import datetime, timezone
-from typing import List, Optional
-
-import requests
-from fastapi import FastAPI, HTTPException
+import threading
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, HttpUrl, Field
+from pydantic import BaseModel, HttpUrl, Field, TypeAdapter
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+import async_database
+import schemas
+from analytics import portfolio_growth
+from cache import MISS, STALE, TTLCache
+from database import (
+    aggregate,
+    append_to_buckets,
+    enable_query_cache,
+    ensure_indexes,
+    get_documents,
+    query_cache_stats,
+    register_indexes,
+    register_schema_indexes,
+    db,
+)
+from http_client import aclose_async_client, close_session, get_async_client, get_session
+from upstream import AsyncSingleFlight, CircuitBreaker, CircuitOpenError, QuotaBucket, SingleFlight
+from write_behind import analytics_writer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stop = threading.Event()
+    refresher = threading.Thread(target=_best_work_refresher, args=(stop,), name="best-work-refresher", daemon=True)
+    refresher.start()
+    threading.Thread(target=_ensure_indexes_at_startup, name="ensure-indexes", daemon=True).start()
+    try:
+        yield
+    finally:
+        stop.set()
+        # Write queued analytics events before the process exits
+        await run_in_threadpool(analytics_writer.close)
+        close_session()
+        await aclose_async_client()
 
-from database import create_document, get_documents, db
 
-app = FastAPI(title="Nikhil Lohia — Scriptwriter API")
+app = FastAPI(title="Nikhil Lohia — Scriptwriter API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -44,6 +90,9 @@ class LogoItem(BaseModel):
 
 
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+YOUTUBE_VIDEOS_URL = "https://www.googleapis.com/youtube/v3/videos"
+# videos.list accepts at most 50 comma-separated IDs per call
+YOUTUBE_BATCH_SIZE = 50
 NOTION_PAGE_URL = os.getenv(
     "NOTION_PAGE_URL",
     "https://reinvented-salute-989.notion.site/Nikhil-Lohia-2aaf06f4560e8069ac8ff6149020cbe2",
@@ -51,6 +100,91 @@ NOTION_PAGE_URL = os.getenv(
 DRIVE_FOLDER_ID = os.getenv(
     "GOOGLE_DRIVE_FOLDER_ID", "1AyDd3MiBoGe2zJdLaN2iRyGj8naJo4Np"
 )
+# Concurrent YouTube lookups: worker count and overall deadline (seconds) for a fan-out
+YOUTUBE_FANOUT_WORKERS = int(os.getenv("YOUTUBE_FANOUT_WORKERS", "8"))
+YOUTUBE_FANOUT_DEADLINE = float(os.getenv("YOUTUBE_FANOUT_DEADLINE", "13"))
+
+# Video details cache: fresh for YOUTUBE_CACHE_TTL seconds, then served stale (and refreshed
+# in the background) for up to YOUTUBE_CACHE_STALE_TTL more
+YOUTUBE_CACHE_TTL = float(os.getenv("YOUTUBE_CACHE_TTL", "600"))
+YOUTUBE_CACHE_STALE_TTL = float(os.getenv("YOUTUBE_CACHE_STALE_TTL", "3600"))
+YOUTUBE_CACHE_SIZE = int(os.getenv("YOUTUBE_CACHE_SIZE", "2048"))
+
+_youtube_pool = ThreadPoolExecutor(max_workers=YOUTUBE_FANOUT_WORKERS, thread_name_prefix="youtube")
+youtube_cache = TTLCache(maxsize=YOUTUBE_CACHE_SIZE, ttl=YOUTUBE_CACHE_TTL, stale_ttl=YOUTUBE_CACHE_STALE_TTL)
+# Per-video view-count history, one bucket document per video per day
+METRICS_COLLECTION = "youtube_metrics"
+register_indexes(METRICS_COLLECTION, [
+    # One bucket per video per day: the upsert key of _store_youtube_details
+    IndexModel([("video_id", ASCENDING), ("day", ASCENDING)], unique=True),
+    # Analytics window scans
+    IndexModel([("day", ASCENDING)]),
+])
+# Metric writes run on their own small pool so a slow database cannot take fan-out workers
+YOUTUBE_STORE_WORKERS = int(os.getenv("YOUTUBE_STORE_WORKERS", "2"))
+_youtube_store_pool = ThreadPoolExecutor(max_workers=YOUTUBE_STORE_WORKERS, thread_name_prefix="youtube-store")
+# Stored-details reads are on the request path: the server aborts them after this many ms
+YOUTUBE_STORED_READ_MS = int(os.getenv("YOUTUBE_STORED_READ_MS", "200"))
+
+# Negative cache: IDs that videos.list did not return (deleted, private or mistyped videos) are
+# not asked about again for YOUTUBE_NEGATIVE_CACHE_TTL seconds. Kept shorter than YOUTUBE_CACHE_TTL
+# so a video that becomes public again is picked up at least as quickly as a changed one
+YOUTUBE_NEGATIVE_CACHE_TTL = float(os.getenv("YOUTUBE_NEGATIVE_CACHE_TTL", "300"))
+YOUTUBE_NEGATIVE_CACHE_SIZE = int(os.getenv("YOUTUBE_NEGATIVE_CACHE_SIZE", "1024"))
+youtube_negative_cache = TTLCache(maxsize=YOUTUBE_NEGATIVE_CACHE_SIZE, ttl=YOUTUBE_NEGATIVE_CACHE_TTL)
+
+# Concurrent cache misses for the same video share one in-flight videos.list request
+youtube_flight = SingleFlight()
+youtube_async_flight = AsyncSingleFlight()
+_background_tasks = set()
+
+# Circuit breakers: once CIRCUIT_FAILURE_RATE of the last CIRCUIT_WINDOW calls to an upstream
+# fail, skip it for CIRCUIT_OPEN_SECONDS and serve cached data or placeholders immediately
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+# YouTube Data API quota: unit cost per endpoint, daily budget and short-term burst. Background
+# refreshes leave YOUTUBE_QUOTA_RESERVE of the budget to interactive requests.
+YOUTUBE_UNIT_COSTS = {"videos.list": 1}
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+YOUTUBE_QUOTA_BURST = int(os.getenv("YOUTUBE_QUOTA_BURST", "500"))
+YOUTUBE_QUOTA_RESERVE = float(os.getenv("YOUTUBE_QUOTA_RESERVE", "0.2"))
+
+youtube_quota = QuotaBucket(YOUTUBE_DAILY_QUOTA, YOUTUBE_QUOTA_BURST, YOUTUBE_QUOTA_RESERVE)
+youtube_breaker = CircuitBreaker("youtube", CIRCUIT_WINDOW, CIRCUIT_FAILURE_RATE, CIRCUIT_MIN_CALLS, CIRCUIT_OPEN_SECONDS)
+notion_breaker = CircuitBreaker("notion", CIRCUIT_WINDOW, CIRCUIT_FAILURE_RATE, CIRCUIT_MIN_CALLS, CIRCUIT_OPEN_SECONDS)
+# Stored YouTube details: while Mongo is unreachable (server selection blocks until its timeout)
+# requests skip the read and go straight to the API
+metrics_breaker = CircuitBreaker("metrics", CIRCUIT_WINDOW, CIRCUIT_FAILURE_RATE, CIRCUIT_MIN_CALLS, CIRCUIT_OPEN_SECONDS)
+
+# Best-work snapshot: rebuilt every BEST_WORK_REFRESH_INTERVAL seconds by a background thread
+# started in the app lifespan, and served to requests as pre-serialized JSON
+BEST_WORK_REFRESH_INTERVAL = float(os.getenv("BEST_WORK_REFRESH_INTERVAL", "300"))
+# Number of YouTube links shown as best work, and the read size used while scanning the Notion page
+BEST_WORK_LIMIT = int(os.getenv("BEST_WORK_LIMIT", "3"))
+NOTION_CHUNK_SIZE = 64 * 1024
+# While the Notion page is unchanged, YouTube details are only re-read once the snapshot is this old
+BEST_WORK_MAX_AGE = float(os.getenv("BEST_WORK_MAX_AGE", "3600"))
+
+_best_work_snapshot: Optional[bytes] = None
+_best_work_built_at = 0.0
+_best_work_cold_build: Optional["asyncio.Future[bytes]"] = None
+_best_work_build_lock = threading.Lock()
+_work_items_adapter = TypeAdapter(List[WorkItem])
+# Any common YouTube video URL shape; group 1 is the video ID
+_YOUTUBE_ID_RE = re.compile(
+    r"(?:youtu\.be/|youtube(?:-nocookie)?\.com/(?:(?:embed|shorts|live|v|e)/|(?:watch)?\?(?:[^#\s]*?&)?v=))"
+    r"([A-Za-z0-9_-]{6,})",
+    re.IGNORECASE,
+)
+# Escaped hrefs as they appear in Notion's server-rendered page data
+_NOTION_HREF_RE = re.compile(r'href="(https?:\\/\\/[^"]+)"')
+# Longest unterminated href carried between streamed chunks
+_MAX_HREF_LENGTH = 4096
+# Validators, content hash and extracted links of the last processed Notion fetch
+_notion_page: Dict[str, Any] = {"etag": None, "last_modified": None, "content_hash": None, "links": None}
 
 
 @app.get("/")
@@ -90,103 +224,403 @@ def test_database():
 
 # -------- Utilities ---------
 
+def extract_youtube_ids(urls: Iterable[str]) -> List[Optional[str]]:
+    """Video ID for each URL (None where there is none), using one precompiled pattern.
+    Handles youtu.be/ID, watch?v=ID (v anywhere in the query), /embed/, /shorts/, /live/, /v/
+    and /e/ paths, on www., m., music. and youtube-nocookie.com hosts.
+    """
+    search = _YOUTUBE_ID_RE.search
+    return [m.group(1) if isinstance(url, str) and (m := search(url)) else None for url in urls]
+
+
 def extract_youtube_id(url: str) -> Optional[str]:
+    return extract_youtube_ids((url,))[0]
+
+
+def _parse_video_item(item: dict) -> dict:
+    snippet = item.get("snippet", {})
+    stats = item.get("statistics", {})
+    return {
+        "title": snippet.get("title"),
+        "channel": snippet.get("channelTitle"),
+        "thumbnail_url": snippet.get("thumbnails", {}).get("high", {}).get("url"),
+        "upload_date": snippet.get("publishedAt"),
+        "views": int(stats.get("viewCount", 0)) if stats.get("viewCount") else None,
+    }
+
+
+def _fetch_youtube_videos(video_ids: List[str]) -> Dict[str, dict]:
+    """One videos.list round trip (1 quota unit) for up to YOUTUBE_BATCH_SIZE IDs."""
+    resp = get_session().get(
+        YOUTUBE_VIDEOS_URL,
+        params={"part": "snippet,statistics", "id": ",".join(video_ids), "key": YOUTUBE_API_KEY},
+        timeout=12,
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    return {item["id"]: _parse_video_item(item) for item in data.get("items", []) if item.get("id")}
+
+
+async def _afetch_youtube_videos(video_ids: List[str]) -> Dict[str, dict]:
+    """Non-blocking counterpart of _fetch_youtube_videos on the shared async client."""
+    resp = await get_async_client().get(
+        YOUTUBE_VIDEOS_URL,
+        params={"part": "snippet,statistics", "id": ",".join(video_ids), "key": YOUTUBE_API_KEY},
+        timeout=12,
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    return {item["id"]: _parse_video_item(item) for item in data.get("items", []) if item.get("id")}
+
+
+def _claim_youtube_fetch(video_ids: List[str], background: bool) -> Tuple[Dict[str, Optional[dict]], List[str]]:
+    """Split a chunk into already-cached details and the IDs that still need a videos.list call.
+    The returned ID list is empty when there is nothing to fetch or no quota to fetch it with.
+    """
+    # A flight that finished between our cache miss and claiming the ID has already cached it
+    found = {vid: youtube_cache.peek(vid) for vid in video_ids}
+    missing = [vid for vid, details in found.items() if details is None]
+    # Out of quota: skip the call and let callers fall back to cached data
+    if missing and not youtube_quota.try_acquire(YOUTUBE_UNIT_COSTS["videos.list"], "videos.list", background=background):
+        return found, []
+    return found, missing
+
+
+def _record_youtube_fetch(missing: List[str], found: Dict[str, Optional[dict]]) -> None:
+    fetched = {vid: found[vid] for vid in missing if found.get(vid) is not None}
+    for vid, details in fetched.items():
+        youtube_cache.set(vid, details)
+        youtube_negative_cache.delete(vid)
+    for vid in missing:
+        if vid not in fetched:
+            youtube_negative_cache.set(vid, True)
+            # Drop any stale details so they are not served (and refetched) once more
+            youtube_cache.delete(vid)
+    if fetched:
+        _youtube_store_pool.submit(_store_youtube_details, fetched)
+
+
+def _fetch_and_cache_youtube(video_ids: List[str], background: bool = False) -> Dict[str, Optional[dict]]:
+    found, missing = _claim_youtube_fetch(video_ids, background)
+    if not missing:
+        return found
     try:
-        # Handles youtu.be/ID, youtube.com/watch?v=ID, and with params
-        short_match = re.search(r"youtu\.be/([\w-]{6,})", url)
-        if short_match:
-            return short_match.group(1)
-        id_match = re.search(r"v=([\w-]{6,})", url)
-        if id_match:
-            return id_match.group(1)
-        embed_match = re.search(r"/embed/([\w-]{6,})", url)
-        if embed_match:
-            return embed_match.group(1)
+        found.update(youtube_breaker.call(_fetch_youtube_videos, missing))
+    except CircuitOpenError:
+        # Rejected before reaching YouTube: the units claimed for the call were not spent
+        youtube_quota.refund(YOUTUBE_UNIT_COSTS["videos.list"], "videos.list")
+        return found
     except Exception:
-        return None
-    return None
+        return found
+    _record_youtube_fetch(missing, found)
+    return found
 
 
-def get_youtube_details(video_id: str):
-    if not YOUTUBE_API_KEY:
-        return None
+async def _afetch_and_cache_youtube(video_ids: List[str]) -> Dict[str, Optional[dict]]:
+    found, missing = _claim_youtube_fetch(video_ids, background=False)
+    if not missing:
+        return found
+    try:
+        found.update(await youtube_breaker.acall(_afetch_youtube_videos, missing))
+    except CircuitOpenError:
+        # Rejected before reaching YouTube: the units claimed for the call were not spent
+        youtube_quota.refund(YOUTUBE_UNIT_COSTS["videos.list"], "videos.list")
+        return found
+    except Exception:
+        return found
+    _record_youtube_fetch(missing, found)
+    return found
+
+
+def _store_youtube_details(fetched: Dict[str, dict]) -> None:
+    """Append a view-count sample per video to its daily bucket and record the latest details."""
+    if db is None:
+        return
+    now = datetime.now(timezone.utc)
+    day = now.strftime("%Y-%m-%d")
     try:
-        url = (
-            "https://www.googleapis.com/youtube/v3/videos?part=snippet,statistics&id="
-            + video_id
-            + "&key="
-            + YOUTUBE_API_KEY
+        append_to_buckets(
+            METRICS_COLLECTION,
+            (
+                ({"video_id": vid, "day": day}, {"t": now, "views": details.get("views")}, {"latest": {**details, "fetched_at": now}})
+                for vid, details in fetched.items()
+            ),
         )
-        resp = requests.get(url, timeout=12)
-        resp.raise_for_status()
-        data = resp.json()
-        if not data.get("items"):
-            return None
-        item = data["items"][0]
-        snippet = item.get("snippet", {})
-        stats = item.get("statistics", {})
-        return {
-            "title": snippet.get("title"),
-            "channel": snippet.get("channelTitle"),
-            "thumbnail_url": snippet.get("thumbnails", {}).get("high", {}).get("url"),
-            "upload_date": snippet.get("publishedAt"),
-            "views": int(stats.get("viewCount", 0)) if stats.get("viewCount") else None,
-        }
     except Exception:
-        return None
+        pass
 
 
-# -------- Data Endpoints ---------
+# Only the fields _use_stored_youtube_details reads; skips the (large) samples arrays
+_STORED_YOUTUBE_PROJECTION = {"_id": 0, "video_id": 1, "latest": 1}
 
-@app.get("/api/notion/best-work", response_model=List[WorkItem])
-def notion_best_work():
-    """Attempt to read the public Notion page and extract YouTube links and titles.
-    Fallback: return placeholders with the Notion link for manual update in the UI.
+
+def _stored_youtube_filter(video_ids: List[str]) -> dict:
+    # The latest sample is in today's or, just after midnight, yesterday's bucket
+    now = datetime.now(timezone.utc)
+    days = [now.strftime("%Y-%m-%d"), (now - timedelta(days=1)).strftime("%Y-%m-%d")]
+    return {"video_id": {"$in": video_ids}, "day": {"$in": days}}
+
+
+def _use_stored_youtube_details(docs: List[dict]) -> Dict[str, Tuple[dict, bool]]:
+    """Latest stored details per video that are still within the cache's fresh + stale window.
+    Returns {video_id: (details, is_stale)} and warms youtube_cache with what it finds.
     """
+    now = datetime.now(timezone.utc)
+    latest: Dict[str, dict] = {}
+    for doc in docs:
+        entry = doc.get("latest") or {}
+        fetched_at = entry.get("fetched_at")
+        if not isinstance(fetched_at, datetime):
+            continue
+        if fetched_at.tzinfo is None:
+            entry["fetched_at"] = fetched_at.replace(tzinfo=timezone.utc)
+        current = latest.get(doc["video_id"])
+        if current is None or entry["fetched_at"] > current["fetched_at"]:
+            latest[doc["video_id"]] = entry
+    found: Dict[str, Tuple[dict, bool]] = {}
+    for vid, entry in latest.items():
+        age = (now - entry.pop("fetched_at")).total_seconds()
+        if age >= YOUTUBE_CACHE_TTL + YOUTUBE_CACHE_STALE_TTL:
+            continue
+        youtube_cache.set(vid, entry, ttl=YOUTUBE_CACHE_TTL - age)
+        found[vid] = (entry, age >= YOUTUBE_CACHE_TTL)
+    return found
+
+
+def _load_stored_youtube_details(video_ids: List[str]) -> Dict[str, Tuple[dict, bool]]:
+    if db is None:
+        return {}
     try:
-        r = requests.get(NOTION_PAGE_URL, timeout=12)
-        r.raise_for_status()
-        html = r.text
-        # Find candidate blocks of YouTube links
-        links = re.findall(r'href="(https?:\\/\\/[^\"]+)"', html)
-        yt_links = []
-        for href in links:
-            href = href.replace("\\/", "/")
-            if "youtube.com/watch" in href or "youtu.be/" in href:
-                yt_links.append(href)
-        # De-duplicate preserving order
-        seen = set()
-        ordered = []
-        for l in yt_links:
-            if l not in seen:
-                seen.add(l)
-                ordered.append(l)
-        ordered = ordered[:3]
-
-        results: List[WorkItem] = []
-        for l in ordered:
-            vid = extract_youtube_id(l)
-            details = get_youtube_details(vid) if vid else None
-            item = WorkItem(
-                title=details.get("title") if details else "YouTube Video",
-                channel=details.get("channel") if details else None,
-                youtube_url=l,
-                thumbnail_url=details.get("thumbnail_url") if details else None,
-                outcome=None,
-                metrics=Metric(
-                    views=details.get("views") if details else None,
-                    avg_retention=None,
-                    upload_date=details.get("upload_date") if details else None,
-                    last_updated=datetime.now(timezone.utc),
-                ),
-            )
-            results.append(item)
-        if results:
-            return results
+        docs = metrics_breaker.call(
+            get_documents, METRICS_COLLECTION, _stored_youtube_filter(video_ids),
+            projection=_STORED_YOUTUBE_PROJECTION, max_time_ms=YOUTUBE_STORED_READ_MS,
+        )
     except Exception:
-        pass
+        return {}
+    return _use_stored_youtube_details(docs)
+
+
+async def _aload_stored_youtube_details(video_ids: List[str]) -> Dict[str, Tuple[dict, bool]]:
+    if async_database.db is None:
+        return {}
+    try:
+        docs = await metrics_breaker.acall(
+            async_database.get_documents, METRICS_COLLECTION, _stored_youtube_filter(video_ids),
+            projection=_STORED_YOUTUBE_PROJECTION, max_time_ms=YOUTUBE_STORED_READ_MS,
+        )
+    except Exception:
+        return {}
+    return _use_stored_youtube_details(docs)
+
+
+def _fetch_youtube_chunk(video_ids: List[str], background: bool = False) -> Dict[str, Optional[dict]]:
+    # IDs another caller is already fetching are waited on rather than requested again
+    return youtube_flight.do_many(video_ids, lambda ids: _fetch_and_cache_youtube(ids, background))
+
+
+async def _afetch_youtube_chunk(video_ids: List[str]) -> Dict[str, Optional[dict]]:
+    return await youtube_async_flight.do_many(video_ids, _afetch_and_cache_youtube)
+
+
+def _refresh_youtube_stale(video_ids: List[str]) -> None:
+    claimed = [vid for vid in video_ids if youtube_cache.try_begin_refresh(vid)]
+    try:
+        for i in range(0, len(claimed), YOUTUBE_BATCH_SIZE):
+            _fetch_youtube_chunk(claimed[i : i + YOUTUBE_BATCH_SIZE], background=True)
+    finally:
+        for vid in claimed:
+            youtube_cache.end_refresh(vid)
+
+
+def _lookup_cached_youtube(ids: List[str]) -> Tuple[Dict[str, Optional[dict]], List[str], List[str]]:
+    """Resolve IDs from the in-memory caches: returns (results, missing, stale)."""
+    results: Dict[str, Optional[dict]] = {vid: None for vid in ids}
+    missing, stale = [], []
+    for vid in ids:
+        state, details = youtube_cache.get(vid)
+        if state == MISS:
+            # Known not to exist: leave as None without asking Mongo or Google
+            if youtube_negative_cache.get(vid)[0] == MISS:
+                missing.append(vid)
+            continue
+        results[vid] = details
+        if state == STALE:
+            stale.append(vid)
+    return results, missing, stale
+
+
+def _merge_stored_youtube(results: Dict[str, Optional[dict]], missing: List[str], stale: List[str], stored: Dict[str, Tuple[dict, bool]]) -> None:
+    for vid, (details, is_stale) in stored.items():
+        results[vid] = details
+        missing.remove(vid)
+        if is_stale:
+            stale.append(vid)
+
+
+def get_youtube_details(video_id: str):
+    return get_youtube_details_batch([video_id]).get(video_id)
+
+
+def get_youtube_details_batch(
+    video_ids: Iterable[str], deadline: float = None, background: bool = False
+) -> Dict[str, Optional[dict]]:
+    """Look up many videos, serving from youtube_cache, then the Mongo metrics store, where possible.
+    Stale entries are returned as-is and refreshed in the background. Misses are fetched
+    with videos.list, YOUTUBE_BATCH_SIZE IDs per request, chunks running concurrently on the
+    shared pool; chunks still running after `deadline` seconds, failed chunks and unknown
+    IDs all resolve to None. Background lookups rank below interactive ones for YouTube quota.
+    """
+    ids = list(dict.fromkeys(vid for vid in video_ids if vid))
+    results, missing, stale = _lookup_cached_youtube(ids)
+    if missing:
+        # Details persisted by an earlier run or another worker
+        _merge_stored_youtube(results, missing, stale, _load_stored_youtube_details(missing))
+    if not YOUTUBE_API_KEY:
+        return results
+    if stale:
+        _youtube_pool.submit(_refresh_youtube_stale, stale)
+    if not missing:
+        return results
+
+    futures = [
+        _youtube_pool.submit(_fetch_youtube_chunk, missing[i : i + YOUTUBE_BATCH_SIZE], background)
+        for i in range(0, len(missing), YOUTUBE_BATCH_SIZE)
+    ]
+    done, _ = wait(futures, timeout=YOUTUBE_FANOUT_DEADLINE if deadline is None else deadline)
+    for f in done:
+        results.update(f.result())
+    return results
+
+
+async def aget_youtube_details_batch(video_ids: Iterable[str], deadline: float = None) -> Dict[str, Optional[dict]]:
+    """Event-loop counterpart of get_youtube_details_batch for async endpoints.
+    videos.list calls go through the shared async HTTP client, so waiting on Google holds no
+    worker thread. Stale refreshes still run on the background pool.
+    """
+    ids = list(dict.fromkeys(vid for vid in video_ids if vid))
+    results, missing, stale = _lookup_cached_youtube(ids)
+    if missing:
+        stored = await _aload_stored_youtube_details(missing)
+        _merge_stored_youtube(results, missing, stale, stored)
+    if not YOUTUBE_API_KEY:
+        return results
+    if stale:
+        _youtube_pool.submit(_refresh_youtube_stale, stale)
+    if not missing:
+        return results
+
+    tasks = [
+        asyncio.ensure_future(_afetch_youtube_chunk(missing[i : i + YOUTUBE_BATCH_SIZE]))
+        for i in range(0, len(missing), YOUTUBE_BATCH_SIZE)
+    ]
+    done, pending = await asyncio.wait(tasks, timeout=YOUTUBE_FANOUT_DEADLINE if deadline is None else deadline)
+    # Chunks past the deadline keep running and still warm the cache; hold a reference until they finish
+    for task in pending:
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    for task in done:
+        results.update(task.result())
+    return results
+
+
+def _work_item(url: str, details: Optional[dict], avg_retention: Optional[float] = None) -> WorkItem:
+    return WorkItem(
+        title=details.get("title") if details else "YouTube Video",
+        channel=details.get("channel") if details else None,
+        youtube_url=url,
+        thumbnail_url=details.get("thumbnail_url") if details else None,
+        outcome=None,
+        metrics=Metric(
+            views=details.get("views") if details else None,
+            avg_retention=avg_retention,
+            upload_date=details.get("upload_date") if details else None,
+            last_updated=datetime.now(timezone.utc),
+        ),
+    )
+
 
-    # Fallback placeholders
+# -------- Best-work snapshot ---------
+
+def extract_youtube_links(chunks: Iterable[str], limit: int = BEST_WORK_LIMIT) -> List[str]:
+    """Scan streamed Notion HTML for unique YouTube hrefs, in page order.
+    Stops consuming `chunks` as soon as `limit` links are found; an href split across
+    chunk boundaries is carried over and matched once the next chunk arrives.
+    """
+    found: List[str] = []
+    seen = set()
+    buf = ""
+    for chunk in chunks:
+        buf += chunk
+        pos = 0
+        for m in _NOTION_HREF_RE.finditer(buf):
+            pos = m.end()
+            href = m.group(1).replace("\\/", "/")
+            if href not in seen and _YOUTUBE_ID_RE.search(href):
+                seen.add(href)
+                found.append(href)
+                if len(found) >= limit:
+                    return found
+        # Carry over only an href whose closing quote has not arrived yet (bounded in length);
+        # otherwise just enough characters to complete a 'href="' split across chunks
+        tail = buf.rfind('href="', pos)
+        if tail != -1 and buf.find('"', tail + len('href="')) == -1 and len(buf) - tail <= _MAX_HREF_LENGTH:
+            buf = buf[tail:]
+        else:
+            buf = buf[max(pos, len(buf) - len('href="') + 1) :]
+    return found
+
+
+def _fetch_best_work_links() -> Optional[List[str]]:
+    """Stream the public Notion page and extract its YouTube links, reading only as far as needed.
+    Once a fetch has been processed, requests are conditional on its ETag/Last-Modified;
+    returns None when the page is unchanged (304, or the same hash for the consumed content).
+    """
+    headers = {}
+    if _notion_page["links"] is not None:
+        if _notion_page["etag"]:
+            headers["If-None-Match"] = _notion_page["etag"]
+        if _notion_page["last_modified"]:
+            headers["If-Modified-Since"] = _notion_page["last_modified"]
+    with get_session().get(NOTION_PAGE_URL, headers=headers, timeout=12, stream=True) as r:
+        if r.status_code == 304:
+            return None
+        r.raise_for_status()
+        # Validators are only stored with the links they describe, once the body was read
+        etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+        digest = hashlib.sha256()
+        decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+
+        def chunks():
+            for raw in r.iter_content(NOTION_CHUNK_SIZE):
+                digest.update(raw)
+                yield decoder.decode(raw)
+
+        links = extract_youtube_links(chunks(), BEST_WORK_LIMIT)
+    content_hash = digest.hexdigest()
+    unchanged = _notion_page["links"] is not None and content_hash == _notion_page["content_hash"]
+    _notion_page["etag"] = etag
+    _notion_page["last_modified"] = last_modified
+    if unchanged:
+        return None
+    _notion_page["content_hash"] = content_hash
+    _notion_page["links"] = links
+    return links
+
+
+def build_best_work(links: List[str], background: bool = False) -> Optional[List[WorkItem]]:
+    """Build work items for the given YouTube links; None when there are none."""
+    # Fetch all videos in one batched lookup instead of one request per link
+    ids = dict(zip(links, extract_youtube_ids(links)))
+    details_by_id = get_youtube_details_batch(ids.values(), background=background)
+
+    results: List[WorkItem] = []
+    for l in links:
+        vid = ids[l]
+        results.append(_work_item(l, details_by_id.get(vid) if vid else None))
+    return results or None
+
+
+def _placeholder_work_items() -> List[WorkItem]:
     now = datetime.now(timezone.utc)
     return [
         WorkItem(
@@ -216,63 +650,327 @@ def notion_best_work():
     ]
 
 
+def refresh_best_work_snapshot(force: bool = True, background: bool = False) -> bytes:
+    """Rebuild the best-work list and swap in its serialized JSON.
+    With force=False an existing snapshot is returned without rebuilding. When the Notion
+    page is unchanged the snapshot is kept until it is BEST_WORK_MAX_AGE seconds old, then
+    rebuilt from the previously extracted links. A failed rebuild keeps the previous snapshot;
+    placeholders are only used when there is none.
+    """
+    global _best_work_snapshot, _best_work_built_at
+    with _best_work_build_lock:
+        if not force and _best_work_snapshot is not None:
+            return _best_work_snapshot
+        try:
+            links = notion_breaker.call(_fetch_best_work_links)
+            if links is None:
+                if _best_work_snapshot is not None and time.monotonic() - _best_work_built_at < BEST_WORK_MAX_AGE:
+                    return _best_work_snapshot
+                links = _notion_page["links"] or []
+            items = build_best_work(links, background=background)
+        except Exception:
+            items = None
+        if items is None:
+            if _best_work_snapshot is not None:
+                return _best_work_snapshot
+            items = _placeholder_work_items()
+        snapshot = _work_items_adapter.dump_json(items)
+        _best_work_snapshot = snapshot
+        _best_work_built_at = time.monotonic()
+        return snapshot
+
+
+# Indexes declared on the models in schemas.py
+register_schema_indexes(*vars(schemas).values())
+
+# Result of the startup index reconciliation, shown on /api/diagnostics
+_index_report: Dict[str, Any] = {"status": "pending"}
+
+
+def _ensure_indexes_at_startup() -> None:
+    # Runs off the event loop so an unreachable database cannot hold up startup
+    global _index_report
+    if db is None:
+        _index_report = {"status": "skipped", "reason": "Database not available"}
+        return
+    try:
+        _index_report = {"status": "ok", "collections": ensure_indexes()}
+    except Exception as e:
+        _index_report = {"status": "error", "error": str(e)}
+
+
+def _best_work_refresher(stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            refresh_best_work_snapshot(background=True)
+        except Exception:
+            pass
+        stop.wait(BEST_WORK_REFRESH_INTERVAL)
+
+
+# -------- Data Endpoints ---------
+
+async def _await_best_work_snapshot() -> bytes:
+    # Cold start: every waiting request shares a single build running on one worker thread
+    global _best_work_cold_build
+    build = _best_work_cold_build
+    if (
+        build is None
+        or build.get_loop() is not asyncio.get_running_loop()
+        or (build.done() and (build.cancelled() or build.exception() is not None))
+    ):
+        _best_work_cold_build = asyncio.ensure_future(run_in_threadpool(refresh_best_work_snapshot, False))
+    return await asyncio.shield(_best_work_cold_build)
+
+
+@app.get("/api/notion/best-work", response_model=List[WorkItem])
+async def notion_best_work():
+    """Serve the pre-serialized best-work snapshot kept fresh by the background refresher.
+    Before the first refresh completes, requests wait for a single shared build.
+    Fallback: placeholders with the Notion link for manual update in the UI.
+    """
+    snapshot = _best_work_snapshot or await _await_best_work_snapshot()
+    return Response(content=snapshot, media_type="application/json")
+
+
 class MetricsRequest(BaseModel):
     url: HttpUrl
     manual_retention_pct: Optional[float] = None
 
 
 @app.post("/api/youtube/metrics", response_model=WorkItem)
-def refresh_metrics(req: MetricsRequest):
+async def refresh_metrics(req: MetricsRequest):
     vid = extract_youtube_id(str(req.url))
     if not vid:
         raise HTTPException(status_code=400, detail="Invalid YouTube URL")
-    details = get_youtube_details(vid)
-    now = datetime.now(timezone.utc)
-    return WorkItem(
-        title=details.get("title") if details else "YouTube Video",
-        channel=details.get("channel") if details else None,
-        youtube_url=str(req.url),
-        thumbnail_url=details.get("thumbnail_url") if details else None,
-        outcome=None,
-        metrics=Metric(
-            views=details.get("views") if details else None,
-            avg_retention=req.manual_retention_pct,
-            upload_date=details.get("upload_date") if details else None,
-            last_updated=now,
-        ),
-    )
+    details = (await aget_youtube_details_batch([vid])).get(vid)
+    return _work_item(str(req.url), details, avg_retention=req.manual_retention_pct)
+
+
+class BatchMetricsRequest(BaseModel):
+    urls: List[HttpUrl] = Field(..., min_length=1, max_length=1000)
+
+
+@app.post("/api/youtube/metrics/batch", response_model=List[WorkItem])
+async def refresh_metrics_batch(req: BatchMetricsRequest):
+    urls = [str(u) for u in req.urls]
+    ids = extract_youtube_ids(urls)
+    invalid = [u for u, vid in zip(urls, ids) if not vid]
+    if invalid:
+        raise HTTPException(status_code=400, detail={"message": "Invalid YouTube URL", "urls": invalid})
+    details_by_id = await aget_youtube_details_batch(ids)
+    return [_work_item(u, details_by_id.get(vid)) for u, vid in zip(urls, ids)]
+
+
+def _array_to_list(values: np.ndarray, digits: int = 2) -> list:
+    # NaN marks "not enough data"; serialize it as null
+    missing = np.isnan(values)
+    rounded = np.round(values, digits)
+    out = (np.where(missing, 0, rounded).astype(np.int64) if digits == 0 else rounded).astype(object)
+    out[missing] = None
+    return out.tolist()
+
+
+# Longest analytics window accepted; larger values overflow date arithmetic
+ANALYTICS_MAX_DAYS = 3650
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _analytics_pipeline(since: str) -> List[dict]:
+    # One document per video with its samples as parallel arrays, oldest first; subtracting the
+    # epoch turns sample dates into epoch milliseconds inside Mongo, so no datetimes reach Python
+    return [
+        {"$match": {"day": {"$gte": since}}},
+        {"$sort": {"day": 1}},
+        {"$unwind": "$samples"},
+        {"$match": {"samples.t": {"$ne": None}, "samples.views": {"$ne": None}}},
+        {
+            "$group": {
+                "_id": "$video_id",
+                "title": {"$last": "$latest.title"},
+                "t": {"$push": {"$subtract": ["$samples.t", _EPOCH]}},
+                "views": {"$push": "$samples.views"},
+            }
+        },
+        {"$sort": {"_id": 1}},
+    ]
+
+
+@app.get("/api/youtube/analytics")
+def youtube_analytics(days: int = Query(30, ge=1, le=ANALYTICS_MAX_DAYS)):
+    """Views/day, 7-day growth rate and percentile rankings across every tracked video,
+    computed from the last `days` days of stored view-count samples.
+    """
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    # Long windows unwind and group far more samples than the 100 MB in-memory stage limit allows
+    docs = aggregate(METRICS_COLLECTION, _analytics_pipeline(since), allow_disk_use=True)
+
+    # Concatenate the per-video arrays into flat columns: one row per sample
+    index = {doc["_id"]: i for i, doc in enumerate(docs)}
+    titles = {doc["_id"]: doc.get("title") for doc in docs}
+    counts = np.fromiter((len(doc["t"]) for doc in docs), dtype=np.int64, count=len(docs))
+    total = int(counts.sum())
+    video_idx = np.repeat(np.arange(len(docs), dtype=np.int64), counts)
+    t = np.fromiter(itertools.chain.from_iterable(doc["t"] for doc in docs), dtype=np.int64, count=total) / 1000.0
+    views = np.fromiter(itertools.chain.from_iterable(doc["views"] for doc in docs), dtype=float, count=total)
+    stats = portfolio_growth(video_idx, t, views, growth_days=7, n_videos=len(index))
+
+    # Fastest-growing first; videos without enough history sort last
+    order = np.argsort(-np.nan_to_num(stats["views_per_day"], nan=-np.inf), kind="stable")
+    ids = np.array(list(index), dtype=object)[order].tolist()
+    columns = {
+        "views": _array_to_list(stats["views"][order], 0),
+        "views_per_day": _array_to_list(stats["views_per_day"][order]),
+        "growth_7d": _array_to_list(stats["growth"][order], 4),
+        "views_percentile": _array_to_list(stats["views_percentile"][order], 1),
+        "views_per_day_percentile": _array_to_list(stats["views_per_day_percentile"][order], 1),
+        "growth_7d_percentile": _array_to_list(stats["growth_percentile"][order], 1),
+    }
+    videos = [
+        {"video_id": vid, "title": titles.get(vid), **{name: col[n] for name, col in columns.items()}}
+        for n, vid in enumerate(ids)
+    ]
+    total_views = np.nansum(stats["views"]) if len(index) else 0
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "window_days": days,
+        "video_count": len(index),
+        "sample_count": int(video_idx.size),
+        "total_views": int(total_views),
+        "videos": videos,
+    }
 
 
 # Simple logo storage using DB
 LOGO_COLLECTION = "logo"
+# Serves LOGO_LIST_SORT and the (created_at, _id) keyset seeks of paginated listings
+register_indexes(LOGO_COLLECTION, [IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)])])
+# Logos are small and read on every page load; writes through the API clear the cache
+LOGO_CACHE_TTL = float(os.getenv("LOGO_CACHE_TTL", "300"))
+enable_query_cache(LOGO_COLLECTION, ttl=LOGO_CACHE_TTL, maxsize=64)
+# Cursor batch size used when streaming list endpoints as NDJSON
+LIST_STREAM_BATCH_SIZE = int(os.getenv("LIST_STREAM_BATCH_SIZE", "500"))
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Fields returned by GET /api/logos (every field a LogoItem document has)
+LOGO_LIST_PROJECTION = {"name": 1, "image_url": 1, "link_url": 1, "created_at": 1, "updated_at": 1}
+# Order of paginated and NDJSON listings, newest first; the plain array keeps insertion order
+LOGO_LIST_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def _plain_document(d: dict) -> dict:
+    # Convert ObjectId and datetime to strings
+    d["_id"] = str(d.get("_id"))
+    for k, v in list(d.items()):
+        if isinstance(v, datetime):
+            d[k] = v.isoformat()
+    return d
+
+
+def _wants_ndjson(request: Request, format: Optional[str]) -> bool:
+    return format == "ndjson" or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _ndjson_response(documents: AsyncIterator[dict]) -> StreamingResponse:
+    """Stream documents as newline-delimited JSON, one line per document as the cursor yields it."""
+
+    async def lines():
+        try:
+            async for d in documents:
+                yield json.dumps(_plain_document(d), default=str) + "\n"
+        except Exception:
+            # Headers are already sent; end the stream early rather than fail mid-response
+            return
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
 
 
 @app.get("/api/logos")
-def list_logos(limit: int = 50):
+async def list_logos(
+    request: Request,
+    limit: int = 50,
+    format: Optional[str] = None,
+    cursor: Optional[str] = None,
+    paginate: bool = False,
+):
+    """List logos as a JSON array in insertion order, or newest first as an NDJSON stream with
+    `format=ndjson` (or an `Accept: application/x-ndjson` header). Streams read the cursor in
+    batches and use constant memory; pass `limit=0` to export the whole collection.
+
+    With `paginate=true` or a `cursor`, returns newest-first {"items": [...], "next_cursor": ...};
+    pass next_cursor back as `cursor` for the next page (null on the last page). Pages are
+    keyset seeks on (created_at, _id), so deep pages cost the same as the first.
+    """
+    if _wants_ndjson(request, format):
+        if async_database.db is None:
+            return Response(content=b"", media_type=NDJSON_MEDIA_TYPE)
+        return _ndjson_response(
+            async_database.iter_documents(
+                LOGO_COLLECTION,
+                {},
+                limit,
+                batch_size=LIST_STREAM_BATCH_SIZE,
+                projection=LOGO_LIST_PROJECTION,
+                sort=LOGO_LIST_SORT,
+            )
+        )
+    if paginate or cursor:
+        if limit < 1:
+            raise HTTPException(status_code=400, detail="limit must be at least 1 when paginating")
+        try:
+            docs, next_cursor = await async_database.get_page(
+                LOGO_COLLECTION, {}, limit, sort=LOGO_LIST_SORT, cursor=cursor, projection=LOGO_LIST_PROJECTION
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception:
+            return {"items": [], "next_cursor": None}
+        return {"items": [_plain_document(d) for d in docs], "next_cursor": next_cursor}
     try:
-        docs = get_documents(LOGO_COLLECTION, {}, limit)
-        # Convert ObjectId and datetime to strings
-        out = []
-        for d in docs:
-            d["_id"] = str(d.get("_id"))
-            for k, v in list(d.items()):
-                if isinstance(v, datetime):
-                    d[k] = v.isoformat()
-            out.append(d)
-        return out
+        docs = await async_database.get_documents(LOGO_COLLECTION, {}, limit, projection=LOGO_LIST_PROJECTION)
+        return [_plain_document(d) for d in docs]
     except Exception as e:
         return []
 
 
 @app.post("/api/logos")
-def add_logo(item: LogoItem):
+async def add_logo(item: LogoItem):
     try:
-        _id = create_document(LOGO_COLLECTION, item)
+        _id = await async_database.create_document(LOGO_COLLECTION, item)
         return {"inserted_id": _id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class BatchLogosRequest(BaseModel):
+    items: List[LogoItem] = Field(..., min_length=1, max_length=10000)
+
+
+@app.post("/api/logos/batch")
+async def add_logos_batch(req: BatchLogosRequest):
+    """Insert many logos in insert_many batches; returns the inserted IDs and any per-item errors."""
+    try:
+        return await async_database.create_documents(LOGO_COLLECTION, req.items)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/diagnostics")
+def diagnostics():
+    return {
+        "youtube_cache": youtube_cache.stats(),
+        "youtube_negative_cache": youtube_negative_cache.stats(),
+        "youtube_single_flight": youtube_flight.stats(),
+        "youtube_async_single_flight": youtube_async_flight.stats(),
+        "youtube_quota": youtube_quota.stats(),
+        "circuits": {"youtube": youtube_breaker.stats(), "notion": notion_breaker.stats(), "metrics": metrics_breaker.stats()},
+        "indexes": _index_report,
+        "analytics_writer": analytics_writer.stats(),
+        "query_caches": query_cache_stats(),
+    }
+
+
 @app.get("/api/drive/embed")
 def drive_embed():
     # Provide a public embeddable URL for the folder grid view
@@ -6,12 +6,19 @@ Copy and modify these examples for your specific needs.
 """
 
 from datetime import datetime
-from database import create_document, get_documents, update_document, delete_document
+from pymongo import ASCENDING, IndexModel
+from database import create_document, get_documents, update_document, delete_document, register_indexes
+from write_behind import analytics_writer
 
 # =============================================================================
 # USER MANAGEMENT SCHEMA
 # =============================================================================
 
+# get_user_by_email looks users up by email. Registering only takes effect once this module is
+# imported before database.ensure_indexes() runs (main.py does not import it; copy this line
+# next to your own user code, or call ensure_indexes() after importing)
+register_indexes("users", [IndexModel([("email", ASCENDING)], unique=True)])
+
 def create_user(name: str, email: str, password_hash: str):
     """Create a new user"""
     user_data = {
@@ -252,7 +259,7 @@ def create_booking(event_id: str, user_id: str, ticket_quantity: int = 1):
 # =============================================================================
 
 def track_user_activity(user_id: str, action: str, resource_type: str, resource_id: str, metadata: dict = None):
-    """Track user activity for analytics"""
+    """Track user activity for analytics (queued and inserted in batches; returns False if dropped)"""
     activity_data = {
         "user_id": user_id,
         "action": action,  # view, create, update, delete, login, etc.
@@ -264,10 +271,10 @@ def track_user_activity(user_id: str, action: str, resource_type: str, resource_
         "session_id": None,
         "timestamp": datetime.utcnow()
     }
-    return create_document("user_activities", activity_data)
+    return analytics_writer.add("user_activities", activity_data)
 
 def track_page_view(page_path: str, user_id: str = None, session_id: str = None):
-    """Track page views for analytics"""
+    """Track page views for analytics (queued and inserted in batches; returns False if dropped)"""
     pageview_data = {
         "page_path": page_path,
         "user_id": user_id,
@@ -284,7 +291,7 @@ def track_page_view(page_path: str, user_id: str = None, session_id: str = None)
         },
         "timestamp": datetime.utcnow()
     }
-    return create_document("page_views", pageview_data)
+    return analytics_writer.add("page_views", pageview_data)
 
 # =============================================================================
 # NOTIFICATION SCHEMA
@@ -9,10 +9,15 @@ Model name is converted to lowercase for the collection name:
 - User -> "user" collection
 - Product -> "product" collection
 - BlogPost -> "blogs" collection
+
+Indexes are declared on each model as an `__indexes__` list of pymongo IndexModel
+(single, compound, unique, TTL via expireAfterSeconds, text) and are created at
+startup by database.ensure_indexes().
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from pymongo import ASCENDING, TEXT, IndexModel
+from typing import ClassVar, List, Optional
 
 # Example schemas (replace with your own):
 
@@ -21,6 +26,10 @@ class User(BaseModel):
     Users collection schema
     Collection name: "user" (lowercase of class name)
     """
+    __indexes__: ClassVar[List[IndexModel]] = [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ]
+
     name: str = Field(..., description="Full name")
     email: str = Field(..., description="Email address")
     address: str = Field(..., description="Address")
@@ -32,6 +41,11 @@ class Product(BaseModel):
     Products collection schema
     Collection name: "product" (lowercase of class name)
     """
+    __indexes__: ClassVar[List[IndexModel]] = [
+        IndexModel([("category", ASCENDING), ("price", ASCENDING)]),
+        IndexModel([("title", TEXT), ("description", TEXT)]),
+    ]
+
     title: str = Field(..., description="Product title")
     description: Optional[str] = Field(None, description="Product description")
     price: float = Field(..., ge=0, description="Price in dollars")
@@ -40,6 +54,11 @@ class Product(BaseModel):
 
 # Add your own schemas here:
 # --------------------------------------------------
+# Indexes, e.g. newest-first listing plus a TTL that expires documents 30 days after created_at:
+#     __indexes__: ClassVar[List[IndexModel]] = [
+#         IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+#         IndexModel([("created_at", ASCENDING)], expireAfterSeconds=30 * 86400),
+#     ]
 
 # Note: The Flames database viewer will automatically:
 # 1. Read these schemas from GET /schema endpoint
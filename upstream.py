@@ -0,0 +1,333 @@
+"""
+Upstream Call Helpers
+
+Primitives that protect external services (YouTube Data API, Notion) from redundant
+or excessive calls made by this backend.
+"""
+
+import asyncio
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one upstream call whose outcome every caller shares."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do_many(self, keys: Iterable[Hashable], fn: Callable[[List[Hashable]], Dict[Hashable, Any]]) -> Dict[Hashable, Any]:
+        """fn(keys) -> {key: result} is called once for the keys nobody else is fetching.
+        Keys already in flight are waited on instead; keys missing from fn's result resolve to None.
+        """
+        owned: Dict[Hashable, _Call] = {}
+        joined: Dict[Hashable, _Call] = {}
+        with self._lock:
+            for key in keys:
+                if key in owned or key in joined:
+                    continue
+                call = self._calls.get(key)
+                if call is None:
+                    owned[key] = self._calls[key] = _Call()
+                else:
+                    joined[key] = call
+            self.calls += 1 if owned else 0
+            self.coalesced += len(joined)
+
+        results: Dict[Hashable, Any] = {}
+        if owned:
+            error = None
+            try:
+                results = dict(fn(list(owned)))
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                with self._lock:
+                    for key, call in owned.items():
+                        call.result = results.get(key)
+                        call.error = error
+                        del self._calls[key]
+                for call in owned.values():
+                    call.event.set()
+        for key, call in joined.items():
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            results[key] = call.result
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "calls": self.calls, "coalesced": self.coalesced}
+
+
+class AsyncSingleFlight:
+    """Event-loop counterpart of SingleFlight.do_many for coroutine fetchers.
+    A failed or cancelled flight resolves its waiters to None; only the caller that ran it sees the error.
+    """
+
+    def __init__(self):
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do_many(
+        self, keys: Iterable[Hashable], fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+    ) -> Dict[Hashable, Any]:
+        loop = asyncio.get_running_loop()
+        owned: Dict[Hashable, asyncio.Future] = {}
+        joined: Dict[Hashable, asyncio.Future] = {}
+        for key in keys:
+            if key in owned or key in joined:
+                continue
+            future = self._futures.get(key)
+            # Futures from another (e.g. already closed) event loop cannot be awaited here
+            if future is None or future.get_loop() is not loop:
+                owned[key] = self._futures[key] = loop.create_future()
+            else:
+                joined[key] = future
+        self.calls += 1 if owned else 0
+        self.coalesced += len(joined)
+
+        results: Dict[Hashable, Any] = {}
+        if owned:
+            try:
+                results = dict(await fn(list(owned)))
+            finally:
+                for key, future in owned.items():
+                    if self._futures.get(key) is future:
+                        del self._futures[key]
+                    future.set_result(results.get(key))
+        for key, future in joined.items():
+            results[key] = await asyncio.shield(future)
+        return results
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._futures), "calls": self.calls, "coalesced": self.coalesced}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Per-upstream circuit breaker driven by the failure rate over the last `window` calls.
+
+    closed: calls pass through. Once at least `min_calls` outcomes are recorded and the share of
+    failures reaches `failure_rate`, the circuit opens.
+    open: calls fail immediately with CircuitOpenError for `open_seconds`.
+    half_open: a single probe call is let through; success closes the circuit, failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, window: int = 20, failure_rate: float = 0.5, min_calls: int = 5, open_seconds: float = 30.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self._outcomes = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; in half_open, only the first caller gets through."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._open()
+
+    def release_probe(self) -> None:
+        """Give up a half-open probe without recording an outcome (e.g. the call was cancelled)."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._outcomes.clear()
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn through the breaker; any exception it raises counts as a failure and is re-raised."""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or interrupted: no outcome, but a half-open probe must not stay claimed
+            self.release_probe()
+            raise
+        self.record_success()
+        return result
+
+    async def acall(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Async form of call() for coroutine functions."""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or interrupted: no outcome, but a half-open probe must not stay claimed
+            self.release_probe()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 3)
+            return {
+                "state": state,
+                "window_calls": len(self._outcomes),
+                "window_failures": self._outcomes.count(False),
+                "failure_rate_threshold": self.failure_rate,
+                "rejected": self.rejected,
+                "retry_in_seconds": retry_in,
+            }
+
+
+class QuotaBucket:
+    """Token bucket in front of an API with a daily unit quota (e.g. YouTube Data API, 10k units/day).
+
+    Units refill continuously at daily_units/day up to `burst`, and spending is also counted
+    against the daily quota, which resets at midnight in `reset_tz` (Pacific time for Google).
+    Background callers may not spend the last `reserve_fraction` of either budget, so
+    interactive requests keep headroom when traffic spikes.
+    """
+
+    def __init__(self, daily_units: int = 10000, burst: int = 500, reserve_fraction: float = 0.2, reset_tz: str = "America/Los_Angeles"):
+        self.daily_units = daily_units
+        self.burst = burst
+        self.reserve_fraction = reserve_fraction
+        self.rate = daily_units / 86400.0
+        try:
+            self._tz = ZoneInfo(reset_tz)
+        except ZoneInfoNotFoundError:
+            self._tz = None
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._day = self._today()
+        self._spent_today = 0
+        self._spent_by_endpoint: Dict[str, int] = defaultdict(int)
+        self._rejected: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _today(self) -> str:
+        return datetime.now(self._tz).date().isoformat()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._spent_today = 0
+            self._spent_by_endpoint.clear()
+
+    def try_acquire(self, cost: int, endpoint: str, background: bool = False) -> bool:
+        """Spend `cost` units for a call to `endpoint` if the budget allows; False means skip the call."""
+        with self._lock:
+            self._refill()
+            token_floor = self.burst * self.reserve_fraction if background else 0.0
+            daily_floor = self.daily_units * self.reserve_fraction if background else 0.0
+            remaining_today = self.daily_units - self._spent_today
+            if self._tokens - cost < token_floor or remaining_today - cost < daily_floor:
+                self._rejected["background" if background else "interactive"] += 1
+                return False
+            self._tokens -= cost
+            self._spent_today += cost
+            self._spent_by_endpoint[endpoint] += cost
+            return True
+
+    def refund(self, cost: int, endpoint: str) -> None:
+        """Return units acquired for a call that never reached the API (e.g. rejected by a circuit breaker)."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.burst, self._tokens + cost)
+            self._spent_today = max(0, self._spent_today - cost)
+            self._spent_by_endpoint[endpoint] = max(0, self._spent_by_endpoint[endpoint] - cost)
+
+    def remaining(self) -> int:
+        with self._lock:
+            self._refill()
+            return self.daily_units - self._spent_today
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refill()
+            return {
+                "day": self._day,
+                "daily_units": self.daily_units,
+                "remaining_today": self.daily_units - self._spent_today,
+                "tokens": round(self._tokens, 2),
+                "burst": self.burst,
+                "spent_by_endpoint": dict(self._spent_by_endpoint),
+                "rejected": dict(self._rejected),
+            }
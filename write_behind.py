@@ -0,0 +1,158 @@
+"""
+Write-Behind Buffer
+
+Queues high-volume, loss-tolerant inserts (page views, activity events) in memory and writes
+them from a background thread with database.create_documents, so callers on the request path
+only pay for an in-memory append. Documents are stamped with created_at/updated_at when they
+are flushed, so keep the event time in a field of its own (e.g. `timestamp`).
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Union
+
+from pydantic import BaseModel
+
+import database
+
+# Flush when this many documents are queued, or at least every WRITE_BEHIND_FLUSH_INTERVAL seconds
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "1.0"))
+# Back-pressure: at most this many queued documents; add() waits up to WRITE_BEHIND_PUT_TIMEOUT
+# seconds for room before dropping the document
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+WRITE_BEHIND_PUT_TIMEOUT = float(os.getenv("WRITE_BEHIND_PUT_TIMEOUT", "0.05"))
+
+
+class WriteBehindBuffer:
+    """Per-collection insert queue flushed by a daemon thread on size or time thresholds.
+
+    add() never does I/O: it appends to the queue, waking the flusher once `batch_size`
+    documents are pending. When `max_pending` documents are queued (the database is slow or
+    down), add() waits up to `put_timeout` seconds for a flush to make room and then drops the
+    document, so a stalled database costs requests a bounded delay rather than unbounded memory.
+    Batches that fail to insert are dropped and counted. close() flushes what is left.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        put_timeout: float = 0.05,
+        writer: Callable[..., dict] = None,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        self._writer = writer or database.create_documents
+        self._queues: Dict[str, List[Union[BaseModel, dict]]] = defaultdict(list)
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop: Optional[threading.Event] = None
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_error: Optional[str] = None
+
+    def add(self, collection_name: str, document: Union[BaseModel, dict]) -> bool:
+        """Queue a document for insertion; False if it was dropped because the queue stayed full."""
+        with self._cond:
+            if self._pending >= self.max_pending:
+                self._cond.notify_all()
+                deadline = time.monotonic() + self.put_timeout
+                while self._pending >= self.max_pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.dropped += 1
+                        return False
+                    self._cond.wait(remaining)
+            self._queues[collection_name].append(document)
+            self._pending += 1
+            self.enqueued += 1
+            if self._thread is None:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,), name="write-behind", daemon=True)
+                self._thread.start()
+            if self._pending >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _run(self, stop: threading.Event) -> None:
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not stop.is_set() and self._pending < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if stop.is_set():
+                    return
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns the number of documents inserted."""
+        with self._flush_lock:
+            with self._cond:
+                queues, self._queues = self._queues, defaultdict(list)
+                self._pending = 0
+                # Room was made: release callers waiting in add()
+                self._cond.notify_all()
+            written = 0
+            for collection_name, documents in queues.items():
+                try:
+                    report = self._writer(collection_name, documents, batch_size=self.batch_size)
+                except Exception as e:
+                    self.failed += len(documents)
+                    self.last_error = str(e)
+                    continue
+                written += len(report["inserted_ids"])
+                self.failed += len(report["errors"])
+            if queues:
+                self.flushes += 1
+            self.written += written
+            return written
+
+    def close(self, timeout: float = 5.0) -> int:
+        """Stop the flusher thread and write what is still queued. A later add() starts a new thread."""
+        with self._cond:
+            thread, stop = self._thread, self._stop
+            self._thread = self._stop = None
+            if stop is not None:
+                stop.set()
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        return self.flush()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "flushes": self.flushes,
+                "last_error": self.last_error,
+            }
+
+
+# Shared buffer for analytics events; main.py flushes it on shutdown
+analytics_writer = WriteBehindBuffer(
+    batch_size=WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=WRITE_BEHIND_FLUSH_INTERVAL,
+    max_pending=WRITE_BEHIND_MAX_PENDING,
+    put_timeout=WRITE_BEHIND_PUT_TIMEOUT,
+)